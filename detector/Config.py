@@ -5,27 +5,96 @@ SCREEN_HEIGHT = 720
 SCREEN = [SCREEN_WIDTH, SCREEN_HEIGHT]
 FPS = 30
 CAPTION = "Fruit Cut"
+# Steps per second of the simulation, each step moves the entities one tick along their way
+SIMULATION_HZ = 30
+# Frames per second of the display, independent of the simulation, 0 for uncapped
+RENDER_FPS = FPS
+# Most steps a single frame catches up, after a longer hitch the game slows down instead of jumping
+MAX_SIMULATION_STEPS = 5
+# True: only the areas that changed are redrawn and pushed to the display, the whole screen only
+# with a new camera frame. False: the whole screen every frame
+DIRTY_RECTS = False
+# More changed areas than this and the whole screen is pushed instead
+DIRTY_RECTS_MAX = 256
 
 # Parabola parameters, explained in ./detector/Game/Utils.py in @calculate_random_parabola
 SCREEN_MIN_WIDTH_FRUIT = 150
 SCREEN_MIN_HEIGHT_FRUIT = 100
 SCREEN_MAX_HEIGHT_FRUIT = 200
 
+# Scale at which the background subtraction runs, 1 full resolution, 0.5 or 0.25 for a faster subtraction
+BGS_PROCESSING_SCALE = 1.0
+# Run the background subtraction in its own process instead of a thread, see ./detector/computer_vision/ProcessBackend.py
+# None: in a process as soon as there is more than one camera, so each camera gets its own core
+BGS_PROCESS_BACKEND = None
+# MovingAveragePython only processes a window around the players the capture tracked in the last mask,
+# see TrackingWindow in ./detector/computer_vision/BGS.py.
+# The rest of the background is refreshed every BGS_WINDOW_REFRESH_INTERVAL frames.
+# Only MovingAveragePython has the window, it is the game processor as long as the c module is not built.
+# The c wrapper and the OpenCV subtractors always process the whole frame.
+# ./detector/benchmark/TrackingWindow.py measures the game processor with and without the window
+BGS_TRACKING_WINDOW = False
+BGS_WINDOW_REFRESH_INTERVAL = 15
+# Space around the players inside the window, as part of the frame width and height on each side
+BGS_WINDOW_MARGIN = 0.1
+# A window larger than this part of the frame is not worth it, the whole frame is processed instead
+BGS_WINDOW_MAX_AREA = 0.5
+# Seconds the capture waits for the mask of the frame it just handed over, before it reads the next frame
+BGS_RESULT_WAIT = 0.5 / FPS
+
+# Players of each camera, each one is a tracked silhouette in the mask of its webcam
+MAX_PLAYERS = 1
+PLAYER_COLORS = [(255, 0, 0), (0, 0, 255), (0, 255, 0), (255, 255, 0)]
+# Scale of the mask while tracking the players, see ./detector/computer_vision/Tracking.py
+TRACKING_SCALE = 0.25
+# Smallest silhouette that counts as a player, as part of the mask area
+TRACKING_MIN_AREA = 0.01
+
 # Webcam URL
 IP_CAM = "http://192.168.107.68:8080"
+# Webcam URLs, one camera zone each
+IP_CAMS = [IP_CAM]
+# How several cameras share the screen, "SIDE_BY_SIDE" or "COMPOSITE", see CameraLayout in ./detector/computer_vision/Cam.py
+CAMERA_LAYOUT = "SIDE_BY_SIDE"
+# True: one long-lived connection to the mjpeg stream (/video), False: a request per shot.jpg
+IP_CAM_STREAM = True
+# Seconds until a request to the webcam times out
+IP_CAM_TIMEOUT = 5
+# Seconds to wait before the mjpeg stream reconnects
+IP_CAM_RECONNECT_DELAY = 1
 
-ASSET_DIR = os.path.join(os.path.dirname(__file__), "../res/Assets\\")
+ASSET_DIR = os.path.join(os.path.dirname(__file__), "..", "res", "Assets", "")
+
+# Texture sets in res/Assets, size of the set -> directory
+TEXTURE_SETS = {
+    40: os.path.join(ASSET_DIR, "fruit-ninja-assets-master_extended_40", ""),
+    96: os.path.join(ASSET_DIR, "fruit-ninja-assets-master_extended_96", ""),
+}
+# Size set used by the entities
+TEXTURE_SIZE = 40
 
 # Assets to the fruits, relativ
-TEXTURE_DIR = os.path.join(os.path.dirname(__file__), f"{ASSET_DIR}"
-                                                      "fruit-ninja-assets-master_"
-                                                      "extended_40\\")
+TEXTURE_DIR = TEXTURE_SETS[TEXTURE_SIZE]
 
-SOUND_DIR = os.path.join(os.path.dirname(__file__), f"{ASSET_DIR}"
-                                                    "sounds\\")
+SOUND_DIR = os.path.join(ASSET_DIR, "sounds", "")
 
 # Dir to the Captured Videos, relativ
-RECORD_DIR = os.path.join(os.path.dirname(__file__), "../res/Capture\\")
+RECORD_DIR = os.path.join(os.path.dirname(__file__), "..", "res", "Capture", "")
+# True: encode to mp4 in a background thread while playing, False: a .bmp per frame converted after the game
+RECORD_VIDEO = True
+# Frames waiting for the encoder, if it is full a frame is dropped or the game waits
+RECORD_QUEUE_SIZE = 60
+RECORD_BLOCK_WHEN_BEHIND = False
+# Ring of the last raw camera frames in a memory mapped file, see ./detector/computer_vision/BlackBox.py,
+# e.g. os.path.join(RECORD_DIR, "black_box.bbx"), None without one. F9 dumps it while playing
+BLACK_BOX_PATH = None
+# Seconds of frames in the ring
+BLACK_BOX_SECONDS = 10
 
 FONT_SIZE = 26
 FONT_FAMILY = "corbel"
+# Rendered texts kept by the HUD, see TextRenderer in ./detector/game/Utils.py
+TEXT_CACHE_SIZE = 64
+
+# Overlay of the stage timings, see ./detector/Metrics.py, F3 toggles it while playing
+METRICS_OVERLAY = False
@@ -1,11 +1,22 @@
+import argparse
+import os
+import random
+import threading
 import time
 import pygame
 import logging
 
-from detector.game import Entity, Utils
+from detector.game import Assets, Collision, Entity, Utils
+from detector.Metrics import labeled, metrics
+from detector.SessionLog import SessionLog
 import Config
-from detector.computer_vision.Cam import OpenCVCapture, Recorder
+from detector.computer_vision.Cam import CameraLayout, OpenCVCapture, Recorder, camera_areas
+from detector.computer_vision.BlackBox import black_box_path, dump_path
+from detector.computer_vision.Sources import BlackBoxSource, FrameSource, IpCamSource, SyntheticSource, \
+    VideoFileSource, recording_source
+from detector.computer_vision.Tracking import SilhouetteTracker
 from detector.computer_vision import BGS
+from detector.computer_vision.ProcessBackend import ProcessBackSubProcessor
 
 
 
@@ -15,42 +26,84 @@ game_logger = logging.getLogger("Game")
 
 
 class Game:
-    def __init__(self, record_on=False, with_webcam=False, show_fps=False):
+    def __init__(self, record_on=False, with_webcam=False, show_fps=False, show_metrics=None, dirty_rects=None,
+                 seed=None, session_log=None, headless=False):
         """
         The game, brings together all the items,
         Webcam is a Phone Webcam, in Config.py the url has to be set
         :param record_on: if recorder should be used or not
-        :param with_webcam: Should the IP CAM be used
+        :param with_webcam: Should the IP CAMs of Config.IP_CAMS be used, or a FrameSource or a list of them
+        that are used instead. Each camera has its own processor, tracker and Config.MAX_PLAYERS players
+        :param show_metrics: overlay of the stage timings, can be toggled with F3, default Config.METRICS_OVERLAY
+        :param dirty_rects: redraw and push only the changed areas of the screen, default Config.DIRTY_RECTS
+        :param seed: seed of random, the same seed gives the same entities on the same ways, default not seeded
+        :param session_log: path the SessionLog of the game is saved to at its end, it can be replayed
+        with ./detector/benchmark/Replay.py. Without a seed a random one is chosen
+        :param headless: only the simulation, e.g. for a replay: no display, no sound, no camera and no recorder
         """
-        pygame.init()
-        logging.info("Pygame init")
-        pygame.display.set_caption(Config.CAPTION)
-        pygame.mixer.init()
+        self.headless = headless
+        if not headless:
+            pygame.init()
+            logging.info("Pygame init")
+            pygame.display.set_caption(Config.CAPTION)
+            pygame.mixer.init()
 
         self.current_time = time.time()
 
-        self.point_sound = pygame.mixer.Sound(f"{Config.SOUND_DIR}points.wav")
-        self.explosion_sound = pygame.mixer.Sound(f"{Config.SOUND_DIR}explosion.wav")
-        self.point_sound.set_volume(0.5)
+        # a session log can only be replayed with the seed of its entities
+        if seed is None and session_log is not None:
+            seed = random.randrange(2 ** 32)
+        if seed is not None:
+            random.seed(seed)
+        self.seed = seed
+
+        self.point_sound = None
+        self.explosion_sound = None
+        if not headless:
+            self.point_sound = pygame.mixer.Sound(f"{Config.SOUND_DIR}points.wav")
+            self.explosion_sound = pygame.mixer.Sound(f"{Config.SOUND_DIR}explosion.wav")
+            self.point_sound.set_volume(0.5)
 
         self.running = True
-        self.screen = pygame.display.set_mode(Config.SCREEN)
+        self.screen = None
+        if not headless:
+            self.screen = pygame.display.set_mode(Config.SCREEN)
+            game_logger.info(f"Display: {Config.SCREEN}")
 
-        game_logger.info(f"Display: {Config.SCREEN}")
+        # decode and convert every texture once, entities only share these surfaces
+        Assets.texture_atlas.load([entity_typ.value for entity_typ in Entity.EntityTyp])
+        game_logger.info(f"Loaded textures: {len(Assets.texture_atlas)}")
 
         self.clock = pygame.time.Clock()
         self.show_fps = show_fps
         self.fps_tick = 0
+        self.show_metrics = show_metrics if show_metrics is not None else Config.METRICS_OVERLAY
+        self.dirty_rects = dirty_rects if dirty_rects is not None else Config.DIRTY_RECTS
+        # areas drawn on top of the background in the last frame, they are restored in the next one
+        self.drawn_rects = []
+        self.full_redraw = True
 
-        # this games uses sprite_groups of pygame to manage easily all entities
-        self.entity_sprite_group = pygame.sprite.Group()
         # only to display a half fruit, does not belong to any logic after that
         self.cut_entity_group = pygame.sprite.Group()
         self.cut_entities = []
-        # to update remove or else, also a own list of all entities
-        self.entities = []
+        # all entities as arrays, updated and drawn all at once
+        self.entities = Entity.EntityStore()
+
+        if headless:
+            sources = []
+        elif isinstance(with_webcam, FrameSource):
+            sources = [with_webcam]
+        elif isinstance(with_webcam, (list, tuple)):
+            sources = list(with_webcam)
+        elif with_webcam:
+            sources = [IpCamSource(url) for url in Config.IP_CAMS]
+        else:
+            sources = []
+
+        # one player per tracked silhouette of each camera, without webcam only the first one follows the mouse
         self.players = [
-            Player((255, 0, 0), (10, 10), 50)
+            Player(Config.PLAYER_COLORS[i % len(Config.PLAYER_COLORS)], (10, 10 + i * 30), 50)
+            for i in range(Config.MAX_PLAYERS * max(1, len(sources)))
         ]
 
         self.player_sprite_group = pygame.sprite.Group()
@@ -59,26 +112,53 @@ class Game:
 
         game_logger.info(f"Initialized Players: {self.players}")
 
+        # time of the game not yet paid out in simulation steps, see run
+        self.accumulator = 0.
+        self.previous_frame_time = None
+
+        # seed, players and catches of each step, to simulate the game again
+        self.session_log_path = session_log
+        self.session_log = None
+        if session_log is not None:
+            self.session_log = SessionLog(self.seed, len(self.players), Config.SIMULATION_HZ, Config.SCREEN)
+            game_logger.info(f"Session log to {session_log} with seed {self.seed}")
+
         # record tick = each frame will be named after this value
         self.record_tick = 0
 
-        # our webcam instance
-        self.cap = None
-        if with_webcam:
-            self.cap = OpenCVCapture(Config.IP_CAM,
-                                     frame_processor=BGS.BackSubProcessors[
-                                         BGS.BackSubTyp.MOVING_AVERAGE_C_WRAPPER])
-            self.cap.start_fetching_thread()
-            game_logger.info(f"Webcam with IP:{Config.IP_CAM}")
-            if self.cap.frame_processor is not None:
-                game_logger.info(f"Frame processor is set: {self.cap.frame_processor}")
-        else:
+        # our webcam instances, each with its own processor and tracker, in its own area of the screen
+        self.cams = []
+        self.camera_layout = CameraLayout[Config.CAMERA_LAYOUT]
+        # with more than one camera each processor gets its own process, and so its own core
+        in_process = Config.BGS_PROCESS_BACKEND if Config.BGS_PROCESS_BACKEND is not None else len(sources) > 1
+        for index, (source, area) in enumerate(zip(sources, camera_areas(len(sources), self.camera_layout))):
+            if in_process:
+                frame_processor = ProcessBackSubProcessor(BGS.BackSubTyp.MOVING_AVERAGE_C_WRAPPER)
+            else:
+                frame_processor = BGS.BackSubProcessors.create(BGS.BackSubTyp.MOVING_AVERAGE_C_WRAPPER)
+            # a single camera keeps the plain stage names
+            name = f"cam{index}" if len(sources) > 1 else None
+            # the players of the game, the tracker would read them from detector.Config, another module object
+            tracker = SilhouetteTracker(max_players=Config.MAX_PLAYERS)
+            cap = OpenCVCapture(source, frame_processor=frame_processor, tracker=tracker,
+                                name=name, area=area, black_box=black_box_path(name, Config.BLACK_BOX_PATH))
+            cap.start_fetching_thread()
+            self.cams.append(cap)
+            game_logger.info(f"Webcam with source: {source} in {area}")
+            game_logger.info(f"Frame processor is set: {cap.frame_processor}")
+        if not self.cams:
             game_logger.info(f"No Webcam")
+        # camera surfaces and receive times of their frames of the last full redraw
+        self.backgrounds = [None] * len(self.cams)
+        self.background_times = [None] * len(self.cams)
+        # receive time of the camera frame of each camera that was displayed last, a new one ends its latency
+        self.displayed_frame_times = [None] * len(self.cams)
 
         # our recorder
         self.recorder = None
-        if record_on:
-            self.recorder = Recorder()
+        if record_on and not headless:
+            # one frame per simulation step, so the video runs at the speed of the game
+            self.recorder = Recorder(fps=Config.SIMULATION_HZ)
             game_logger.info(f"Recorder with Record directory:{self.recorder.record_dir}")
         else:
             game_logger.info(f"No Recorder")
@@ -91,86 +171,281 @@ class Game:
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     self.running = False
+                # press 'F3' for the stage timings
+                elif event.key == pygame.K_F3:
+                    self.show_metrics = not self.show_metrics
+                # press 'F9' to keep the last seconds of the cameras, see Config.BLACK_BOX_PATH
+                elif event.key == pygame.K_F9:
+                    self.dump_black_boxes()
+
+    def dump_black_boxes(self):
+        """
+        Freezes the black box of each camera into its own file next to it, in a thread so the game goes on
+        """
+        for cap in self.cams:
+            if cap.black_box is not None:
+                threading.Thread(target=cap.black_box.dump, args=(dump_path(cap.black_box.path),),
+                                 daemon=True).start()
 
     def draw_fps(self):
+        """
+        :return: the drawn areas
+        """
         if self.show_fps:
             pos = (Config.SCREEN_WIDTH - 150, Config.SCREEN_HEIGHT - 75)
             black = (255, 255, 255)
-            Utils.draw_text_on_screen(self.screen, f"FPS: {self.clock.get_fps().__floor__()}", pos, black)
+            rects = [Utils.draw_text_on_screen(self.screen, f"FPS: {self.clock.get_fps().__floor__()}", pos, black)]
+            # frames per second of each camera and the p50 of its latency to the display, above the game's
+            if len(self.cams) > 1:
+                for line, cap in enumerate(reversed(self.cams), start=1):
+                    latency = metrics.histogram(labeled("latency.camera_to_display", cap.name)).percentile(50)
+                    text = f"{cap.name}: {cap.fps:.0f} FPS {latency:.0f} ms"
+                    rects.append(Utils.draw_text_on_screen(self.screen, text, (Config.SCREEN_WIDTH - 300,
+                                                           pos[1] - line * Config.FONT_SIZE), black))
+            return rects
+        return []
+
+    def draw_metrics(self):
+        """
+        p50 and p95 in milliseconds of each stage, to see where the frame budget goes
+        :return: the drawn areas
+        """
+        rects = []
+        if self.show_metrics:
+            white = (255, 255, 255)
+            x = Config.SCREEN_WIDTH - 420
+            rects.append(Utils.draw_text_on_screen(self.screen, "stage  p50 / p95 ms", (x, 10), white))
+            for line, (name, values) in enumerate(metrics.summary().items(), start=1):
+                text = f"{name}  {values['p50']:.1f} / {values['p95']:.1f}"
+                rects.append(Utils.draw_text_on_screen(self.screen, text, (x, 10 + line * Config.FONT_SIZE), white))
+        return rects
+
+    def update_player_positions(self):
+        """
+        Moves the players to their tracked silhouettes, each camera has its own Config.MAX_PLAYERS players,
+        without a tracker the first player follows the mouse
+        """
+        if not any(cap.tracker is not None for cap in self.cams):
+            self.players[0].update_mouse(pygame.mouse.get_pos())
+            return
+        for index, cap in enumerate(self.cams):
+            if cap.tracker is None:
+                continue
+            players = self.players[index * Config.MAX_PLAYERS:(index + 1) * Config.MAX_PLAYERS]
+            for player, position in zip(players, cap.get_player_positions()):
+                # a player that is not found stays where it was last seen
+                if position is not None:
+                    player.update_position(position)
+
+    def update_entities(self):
+        """
+        1. Compaction: every entity marked for deletion leaves the game in one pass.
+        2. Collision: the boxes of all catchable entities are checked against all players at once.
+        3. Update: every entity moves on its parabolic way.
+        """
+        start = time.perf_counter()
+        self.entities.compact()
+        compaction_ms = (time.perf_counter() - start) * 1000
+
+        with metrics.time("game.collision"):
+            self.collide()
+
+        start = time.perf_counter()
+        self.entities.update()
+        metrics.record("game.entities", compaction_ms + (time.perf_counter() - start) * 1000)
+
+    def collide(self, player_boxes=None):
+        """
+        Every catchable entity that overlaps a player is caught by it
+        :param player_boxes: (players, 4) boxes of the players, default the boxes of their rects
+        """
+        # only now its flying down it can be caught
+        catchable = self.entities.catchable()
+        # most of the time nothing is flying down, then there is nothing to check
+        if not len(catchable):
+            return
+        if player_boxes is None:
+            player_boxes = Collision.boxes_of([player.rect for player in self.players])
+        entity_indices, player_indices = Collision.find_collisions(self.entities.boxes(catchable), player_boxes)
+        for entity_index, player_index in zip(entity_indices, player_indices):
+            self.catch(self.entities[catchable[entity_index]], self.players[player_index])
+
+    def catch(self, entity, player):
+        """
+        The player caught the entity, a fruit gives points, a bomb takes them
+        """
+        sound = self.point_sound if entity.points > 0 else self.explosion_sound
+        # a headless game has no sound
+        if sound is not None:
+            sound.play()
+        player.update_points(entity.points)
+        entity.delete = True
+        if self.session_log is not None:
+            self.session_log.catch(self.players.index(player), entity.points)
+
+    def draw_background(self):
+        """
+        Black screen without Webcam, else the screen is filled with the images of the webcams.
+        With dirty rects the whole background is only drawn again when it changed,
+        otherwise only the areas drawn in the last frame are restored.
+        :return: receive time of the shown frame of each camera, None for a camera without one
+        """
+        backgrounds, frame_times = [], []
+        for cap in self.cams:
+            # cam is running in another thread,
+            # its normal that at start no image is available
+            background, frame_time = cap.get_ip_cam_frame()
+            backgrounds.append(background)
+            frame_times.append(frame_time)
+        if not self.dirty_rects or frame_times != self.background_times or \
+                any(background is not old for background, old in zip(backgrounds, self.backgrounds)):
+            self.full_redraw = True
+            self.backgrounds, self.background_times = backgrounds, frame_times
+            self.blit_backgrounds(self.screen.get_rect())
+        else:
+            for rect in self.drawn_rects:
+                self.blit_backgrounds(pygame.Rect(rect))
+        return frame_times
+
+    def blit_backgrounds(self, rect):
+        """
+        Draws the camera images into their areas, black where there is no image yet.
+        In CameraLayout.COMPOSITE the images after the first one are laid over it by their maximum,
+        so the masks of all cameras add up.
+        :param rect: area of the screen that is drawn
+        """
+        if not self.cams or None in self.backgrounds:
+            self.screen.fill((0, 0, 0), rect)
+        covered = False
+        for cap, background in zip(self.cams, self.backgrounds):
+            if background is None:
+                continue
+            clip = rect.clip(cap.area)
+            if not clip:
+                continue
+            flags = pygame.BLEND_RGB_MAX if covered and self.camera_layout == CameraLayout.COMPOSITE else 0
+            self.screen.blit(background, clip, clip.move(-cap.area.x, -cap.area.y), special_flags=flags)
+            covered = True
+
+    def update_display(self, rects):
+        """
+        Pushes the whole screen, or with dirty rects only the areas drawn in this
+        and in the last frame, the last ones are background again
+        :param rects: areas drawn on top of the background in this frame
+        """
+        changed = self.drawn_rects + rects
+        if self.full_redraw or len(changed) > Config.DIRTY_RECTS_MAX:
+            pygame.display.update()
+        else:
+            pygame.display.update(changed)
+        self.drawn_rects = rects
+        self.full_redraw = False
+
+    def step(self, player_boxes=None, timed=True):
+        """
+        One step of the simulation, it always covers 1 / Config.SIMULATION_HZ seconds of the game
+        :param player_boxes: boxes of the players if they are known as array already, see collide
+        :param timed: records the stage timings, a replay runs the same step without them
+        """
+        if self.session_log is not None:
+            self.session_log.step(self.players)
+        # spawn a certain amount of entity
+        if len(self.entities) <= 1:
+            self.entities.add_random()
+        if timed:
+            self.update_entities()
+        else:
+            self.entities.compact()
+            self.collide(player_boxes)
+            self.entities.update()
 
     def calculate_average_frames_per_second(self):
-        start = self.current_time
-        end = time.time()
-        return (end - start) / self.record_tick
+        duration = time.time() - self.current_time
+        return self.fps_tick / duration if duration > 0 else 0.
 
     def run(self):
+        """
+        The simulation runs in fixed steps of 1 / Config.SIMULATION_HZ seconds, the display as fast as
+        Config.RENDER_FPS allows. The time of each frame goes into an accumulator, which is paid out in steps,
+        the rest of it places the entities between their previous and their current step.
+        A slow frame is caught up by more steps, so the game keeps its speed under load.
+        """
         while self.running:
-            # simple exit check aka ESC or Exit
-            self.key_manager()
+            self.run_frame()
 
-            # Black screen without Webcam, else
-            # pygame game will be filled with the image of the webcam
-            if self.cap is not None:
-                # cam is running in another thread,
-                # its normal that at start no image is available
-                if self.cap.get_ip_cam_img():
-                    self.screen.blit(self.cap.get_ip_cam_img(), (0, 0))
-            else:
-                self.screen.fill((0, 0, 0))
-
-            # spawn a certain amount of entity
-            if len(self.entity_sprite_group) <= 1:
-                entity = Entity.get_random_entity()
-                # add the entity to both groups, sprite and the intern game group
-                self.entity_sprite_group.add(entity)
-                self.entities.append(entity)
-
-            for player in self.players:
-                player.update_score_board(self.screen)
-                player.update_mouse(pygame.mouse.get_pos())
-
-            # update entities
-            for entity in self.entities:
-                # remove if delete is set
-                if entity.delete:
-                    self.entities.remove(entity)
-                    self.entity_sprite_group.remove(entity)
-                else:
-                    if entity.free2catch:
-                        # check for collision
-                        for player in self.players:
-                            if entity.rect.colliderect(player.rect):
-                                if entity.points > 0:
-                                    self.point_sound.play()
-                                else:
-                                    self.explosion_sound.play()
-                                player.update_points(entity.points)
-                                entity.delete = True
-                    entity.update()
-
-            # pygame will draw all entities by itself
-            # as long as they are in a sprite group
-            self.entity_sprite_group.draw(self.screen)
-            self.player_sprite_group.draw(self.screen)
-
-            # update the recorders counter
-            if self.recorder is not None:
-                self.record_tick += 1
-                self.recorder.record(self.screen, self.record_tick)
-
-            # tick tick
-            self.draw_fps()
-            self.clock.tick(Config.FPS)
-            self.fps_tick += 1
-            # update display last
-            pygame.display.update()
-
-        # frames of the recorder will be saved at the end of the game
+        # the recorder finishes its video at the end of the game
         if self.recorder is not None:
-            self.recorder.convert_to_video()
-        print(f"Average Frames: {self.calculate_average_frames_per_second()}")
+            self.recorder.finish()
+        if self.session_log is not None:
+            self.session_log.save(self.session_log_path)
+            game_logger.info(f"Saved {self.session_log.ticks} steps to {self.session_log_path}")
+        print(f"Average frames per second: {self.calculate_average_frames_per_second():.1f}")
         pygame.quit()
 
+    def run_frame(self):
+        """
+        One frame of the game loop, with as many simulation steps as the time since the last frame asks for
+        :return: number of simulation steps of this frame
+        """
+        frame_start = time.perf_counter()
+        # simple exit check aka ESC or Exit
+        with metrics.time("game.events"):
+            self.key_manager()
+
+        now = time.perf_counter()
+        if self.previous_frame_time is not None:
+            self.accumulator += now - self.previous_frame_time
+        self.previous_frame_time = now
+
+        # players follow on every frame, not only on steps
+        self.update_player_positions()
+
+        step_duration = 1 / Config.SIMULATION_HZ
+        steps = 0
+        while self.accumulator >= step_duration and steps < Config.MAX_SIMULATION_STEPS:
+            self.step()
+            self.accumulator -= step_duration
+            steps += 1
+        if steps == Config.MAX_SIMULATION_STEPS:
+            # too far behind, the rest is dropped
+            self.accumulator = min(self.accumulator, step_duration)
+
+        draw_start = time.perf_counter()
+        frame_times = self.draw_background()
+
+        rects = [player.update_score_board(self.screen) for player in self.players]
+
+        # the store blits all entities at once,
+        # pygame draws the players by itself as long as they are in a sprite group
+        rects += self.entities.draw(self.screen, self.accumulator / step_duration, return_rects=self.dirty_rects) or []
+        self.player_sprite_group.draw(self.screen)
+        rects += self.player_sprite_group.spritedict.values()
+        rects += self.draw_fps()
+        rects += self.draw_metrics()
+        metrics.record("game.draw", (time.perf_counter() - draw_start) * 1000)
+
+        # update the recorders counter, one frame per step
+        if self.recorder is not None:
+            with metrics.time("game.record"):
+                for _ in range(steps):
+                    self.record_tick += 1
+                    self.recorder.record(self.screen, self.record_tick)
+
+        # tick tick
+        with metrics.time("game.wait"):
+            self.clock.tick(Config.RENDER_FPS)
+        self.fps_tick += 1
+        # update display last
+        with metrics.time("game.display"):
+            self.update_display(rects)
+        now = time.perf_counter()
+        for index, (cap, frame_time) in enumerate(zip(self.cams, frame_times)):
+            if frame_time is not None and frame_time != self.displayed_frame_times[index]:
+                metrics.record(labeled("latency.camera_to_display", cap.name), (now - frame_time) * 1000)
+                self.displayed_frame_times[index] = frame_time
+        metrics.record("game.frame", (now - frame_start) * 1000)
+        return steps
+
 
 class Player(pygame.sprite.Sprite):
     def __init__(self, color, score_board_pos, size):
@@ -189,11 +464,53 @@ class Player(pygame.sprite.Sprite):
         self.points += points
 
     def update_score_board(self, screen):
-        Utils.draw_text_on_screen(screen, f'Score: {self.points}', self.score_board_pos, self.color)
+        """
+        :return: the drawn area
+        """
+        return Utils.draw_text_on_screen(screen, f'Score: {self.points}', self.score_board_pos, self.color)
 
     def update_mouse(self, pos):
-        self.rect.update(pos[0] - self.size // 2, pos[1] - self.size // 2, self.size, self.size)
+        self.update_position(pos)
 
-
-game = Game(record_on=False, with_webcam=True, show_fps=True)
-game.run()
+    def update_position(self, pos):
+        """
+        :param pos: centre of the basket, e.g. the centre of the tracked silhouette
+        """
+        self.rect.update(int(pos[0]) - self.size // 2, int(pos[1]) - self.size // 2, self.size, self.size)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=Config.CAPTION)
+    parser.add_argument("--record", action="store_true", help="record the game to Config.RECORD_DIR")
+    camera = parser.add_mutually_exclusive_group()
+    camera.add_argument("--no-webcam", action="store_true", help="play with the mouse, without a camera")
+    camera.add_argument("--video", nargs="+", help="video files or recording dirs of --record instead of the IP cams, "
+                                                   "one per camera")
+    camera.add_argument("--synthetic", type=int, nargs="?", const=1, default=0, metavar="CAMERAS",
+                        help="generated frames instead of the IP cams, of this many cameras")
+    camera.add_argument("--black-box", nargs="+", help="dumped black boxes instead of the IP cams, one per camera")
+    parser.add_argument("--hide-fps", action="store_true")
+    parser.add_argument("--dirty-rects", action="store_true", help="push only the changed areas to the display")
+    parser.add_argument("--metrics", help="writes the stage timings at the end to this .json or .csv file")
+    parser.add_argument("--seed", type=int, help="seed of the entities, the same seed gives the same ways")
+    parser.add_argument("--session-log", help="saves seed, player positions and catches to this file, "
+                                              "to replay the game with detector/benchmark/Replay.py")
+    args = parser.parse_args(args)
+
+    with_webcam = not args.no_webcam
+    if args.video:
+        with_webcam = [recording_source(video, loop=True) if os.path.isdir(video) else VideoFileSource(video, loop=True)
+                       for video in args.video]
+    elif args.black_box:
+        with_webcam = [BlackBoxSource(path, loop=True) for path in args.black_box]
+    elif args.synthetic:
+        with_webcam = [SyntheticSource(seed=index) for index in range(args.synthetic)]
+    game = Game(record_on=args.record, with_webcam=with_webcam, show_fps=not args.hide_fps,
+                dirty_rects=args.dirty_rects or None, seed=args.seed, session_log=args.session_log)
+    game.run()
+    if args.metrics:
+        metrics.export(args.metrics)
+
+
+if __name__ == "__main__":
+    main()
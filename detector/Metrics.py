@@ -0,0 +1,141 @@
+import csv
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Buckets of every histogram, geometric from 0.01 ms to 10 s, each about 12 % wider than the one before
+HISTOGRAM_MIN_MS = 0.01
+HISTOGRAM_MAX_MS = 10000.
+HISTOGRAM_BUCKETS = 120
+
+SUMMARY_FIELDS = ("count", "mean", "p50", "p95", "p99", "max", "last")
+
+
+def labeled(name, label=None):
+    """
+    Name of a stage of one camera, so each camera records into its own histograms
+    :return: e.g. capture.decode.cam1, without a label the name itself
+    """
+    return f"{name}.{label}" if label else name
+
+
+class Histogram:
+    def __init__(self, min_ms=HISTOGRAM_MIN_MS, max_ms=HISTOGRAM_MAX_MS, buckets=HISTOGRAM_BUCKETS):
+        """
+        Durations in milliseconds, counted in a fixed number of geometric buckets.
+        Its size never grows, no matter how long the game runs.
+        Percentiles are the upper edge of their bucket, so they are about 12 % too high at most.
+        Only one thread should record into a histogram, reading it from others is fine.
+        """
+        self.min_ms = min_ms
+        self._log_growth = math.log(max_ms / min_ms) / (buckets - 1)
+        # bucket 0 holds everything below min_ms, the last one everything above max_ms
+        self.counts = [0] * (buckets + 1)
+        self.count = 0
+        self.total = 0.
+        self.max = 0.
+        self.last = 0.
+
+    def record(self, ms):
+        if ms < self.min_ms:
+            index = 0
+        else:
+            index = min(len(self.counts) - 1, 1 + int(math.log(ms / self.min_ms) / self._log_growth))
+        self.counts[index] += 1
+        self.count += 1
+        self.total += ms
+        self.last = ms
+        if ms > self.max:
+            self.max = ms
+
+    def upper_edge(self, index):
+        return self.min_ms * math.exp(index * self._log_growth)
+
+    def percentile(self, q):
+        """
+        :param q: 0 to 100
+        :return: upper edge of the bucket the percentile falls into, but never more than the max
+        """
+        if self.count == 0:
+            return 0.
+        needed = q / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= needed:
+                return min(self.upper_edge(index), self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max,
+            "last": self.last,
+        }
+
+
+class Metrics:
+    def __init__(self):
+        """
+        Histograms of the stages of the capture thread, the background subtraction and the game loop by name,
+        like capture.decode or game.draw. Cheap enough to be always on.
+        """
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name) -> Histogram:
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, Histogram())
+        return histogram
+
+    def record(self, name, ms):
+        self.histogram(name).record(ms)
+
+    @contextmanager
+    def time(self, name):
+        """
+        with metrics.time("capture.decode"): ...
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.histogram(name).record((time.perf_counter() - start) * 1000)
+
+    def summary(self) -> dict:
+        """
+        :return: name -> count, mean, p50, p95, p99, max and last in milliseconds, sorted by name
+        """
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+        return {name: histogram.summary() for name, histogram in histograms}
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+
+    def export(self, path):
+        """
+        Writes the summary as .csv or, for any other extension, as .json
+        """
+        summary = self.summary()
+        with open(path, "w", newline="") as file:
+            if path.lower().endswith(".csv"):
+                writer = csv.writer(file)
+                writer.writerow(("stage",) + SUMMARY_FIELDS)
+                for name, values in summary.items():
+                    writer.writerow([name] + [values[field] for field in SUMMARY_FIELDS])
+            else:
+                json.dump(summary, file, indent=2)
+
+
+# Shared metrics of the game and the capture
+metrics = Metrics()
@@ -0,0 +1,105 @@
+import array
+import struct
+import zlib
+
+import numpy as np
+
+# magic, format version, seed, players, simulation steps per second, screen width and height
+HEADER = struct.Struct("<4sHqHHHH")
+MAGIC = b"FCSL"
+VERSION = 1
+# each catch: simulation step, index of the player, points the player got
+CATCH_DTYPE = np.dtype([("tick", "<u4"), ("player", "<u1"), ("points", "<i2")])
+
+
+class SessionLog:
+    def __init__(self, seed, players, simulation_hz, screen_size):
+        """
+        Everything a game needs to be simulated again:
+        the seed of random, which spawns the entities and picks their ways,
+        and the rect of each player at each simulation step.
+        Catches and score changes are logged as well, a replay is checked against them.
+        Saved as header and a zlib compressed body, the rects as deltas from step to step,
+        so a player that stands still or moves smoothly costs almost nothing,
+        a 10 minute session is a few hundred KB at most.
+        :param seed: int the game seeded random with
+        :param players: number of players
+        :param simulation_hz: steps per second of the game, only informative
+        :param screen_size: (width, height) of the game, the ways of the entities depend on it
+        """
+        self.seed = seed
+        self.players = players
+        self.simulation_hz = simulation_hz
+        self.screen_size = tuple(screen_size)
+        self.ticks = 0
+        # x, y, width, height of every player at every step, appended as they come
+        self._rects = array.array("h")
+        self._catches = []
+
+    def step(self, players):
+        """
+        Called at the start of each simulation step, before anything moves
+        :param players: the players, in the order of their index
+        """
+        for player in players:
+            self._rects.extend(player.rect)
+        self.ticks += 1
+
+    def catch(self, player_index, points):
+        """
+        The player of that index caught an entity in the current step
+        """
+        self._catches.append((self.ticks - 1, player_index, points))
+
+    @property
+    def rects(self) -> np.ndarray:
+        """
+        :return: (ticks, players, 4) int16 array of x, y, width, height
+        """
+        return np.frombuffer(self._rects, dtype=np.int16).reshape((self.ticks, self.players, 4))
+
+    @property
+    def catches(self) -> np.ndarray:
+        """
+        :return: array of CATCH_DTYPE, in the order they happened
+        """
+        return np.array(self._catches, dtype=CATCH_DTYPE)
+
+    def scores(self) -> list:
+        """
+        :return: points of each player at the end of the session
+        """
+        catches = self.catches
+        return [int(catches["points"][catches["player"] == index].sum()) for index in range(self.players)]
+
+    def save(self, path):
+        # the deltas wrap around in int16 and are added up the same way when loading
+        deltas = np.diff(self.rects, axis=0, prepend=np.zeros((1, self.players, 4), dtype=np.int16))
+        # one column after the other, the deltas of a column are mostly the same
+        body = struct.pack("<II", self.ticks, len(self._catches)) + \
+            np.ascontiguousarray(deltas.transpose(1, 2, 0)).astype("<i2").tobytes() + \
+            self.catches.tobytes()
+        with open(path, "wb") as file:
+            file.write(HEADER.pack(MAGIC, VERSION, self.seed, self.players, self.simulation_hz, *self.screen_size))
+            file.write(zlib.compress(body, 9))
+
+    @classmethod
+    def load(cls, path) -> "SessionLog":
+        with open(path, "rb") as file:
+            data = file.read()
+        magic, version, seed, players, simulation_hz, width, height = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is no session log of version {VERSION}")
+        body = zlib.decompress(data[HEADER.size:])
+        ticks, catch_count = struct.unpack_from("<II", body)
+        offset = struct.calcsize("<II")
+        deltas = np.frombuffer(body, dtype="<i2", count=ticks * players * 4, offset=offset)
+        offset += deltas.nbytes
+        rects = np.cumsum(deltas.reshape((players, 4, ticks)).transpose(2, 0, 1), axis=0, dtype=np.int16)
+
+        log = cls(seed, players, simulation_hz, (width, height))
+        log.ticks = ticks
+        log._rects = array.array("h", rects.tobytes())
+        catches = np.frombuffer(body, dtype=CATCH_DTYPE, count=catch_count, offset=offset)
+        log._catches = [(int(tick), int(player), int(points)) for tick, player, points in catches]
+        return log
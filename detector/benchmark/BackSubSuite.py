@@ -0,0 +1,161 @@
+import argparse
+import json
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from detector.computer_vision import BGS
+from detector.computer_vision.Sources import ImageDirectorySource, SyntheticSource
+from detector.computer_vision.Tracking import SilhouetteTracker
+
+# name -> factory(history), every candidate of the suite
+CANDIDATES = {}
+
+
+def register_candidate(name, factory):
+    """
+    A new backend only has to be registered here, e.g.
+    register_candidate("MyProcessor", lambda history: MyProcessor(history=history))
+    :param factory: builds a new BackSubProcessor for a history length
+    """
+    CANDIDATES[name] = factory
+
+
+# every processor of the registry with its defaults
+for _typ in BGS.BackSubProcessors:
+    register_candidate(_typ.name, lambda history, typ=_typ: BGS.BackSubProcessors.create(typ, history=history))
+# the processor of the game, processing only the window around the players
+register_candidate("MOVING_AVERAGE_C_WRAPPER/window",
+                   lambda history: BGS.BackSubProcessors.create(BGS.BackSubTyp.MOVING_AVERAGE_C_WRAPPER, history=history,
+                                                                tracking_window=True))
+# and every combination of MovingAveragePython, the median ones with the exact and the sigma-delta median
+for _calculation in BGS.ThreshCalculationTyp:
+    _medians = list(BGS.MedianTyp) if "MEDIAN" in _calculation.name else [BGS.MedianTyp.EXACT]
+    for _threshold in BGS.ThreshHoldTyp:
+        for _median in _medians:
+            register_candidate(
+                f"MovingAveragePython/{_calculation.name}/{_threshold.name}"
+                + (f"/{_median.name}" if len(_medians) > 1 else ""),
+                lambda history, calculation=_calculation, threshold=_threshold, median=_median: BGS.MovingAveragePython(
+                    history=history, calculation_type=calculation, thresholding_typ=threshold, threshold_manual=20,
+                    median_typ=median))
+
+
+def synthetic_sequence(width, height, frames, seed=0):
+    """
+    :return: list of (frame, ground truth mask)
+    """
+    source = SyntheticSource(width, height, realtime=False, frames=frames, seed=seed)
+    sequence = []
+    while (frame := source.read()) is not None:
+        sequence.append((frame, source.last_mask))
+    return sequence
+
+
+def stored_sequence(frames_dir, masks_dir):
+    """
+    Numbered frames and their numbered ground truth masks, 1.png, 2.png, ..., like ImageDirectorySource reads them
+    :return: list of (frame, ground truth mask)
+    """
+    frames = ImageDirectorySource(frames_dir, realtime=False)
+    masks = ImageDirectorySource(masks_dir, realtime=False)
+    masks.grayscale = True
+    sequence = []
+    while (frame := frames.read()) is not None:
+        sequence.append((frame, masks.read()))
+    return sequence
+
+
+def run(factory, history, sequence, warmup):
+    """
+    Runs one processor synchronously over the sequence, the first warmup frames only build the background.
+    Peak memory is what numpy and python allocate while the processor is built and runs,
+    the models inside OpenCV are not traced.
+    A processor with a tracking_window gets the players tracked in its last mask, like from the capture,
+    the tracking is not part of its fps.
+    :return: dict of the processor class, fps, peak memory, mean IoU, precision, recall and F1 over all pixels
+    """
+    tracemalloc.start()
+    processor = factory(history)
+    tracker = SilhouetteTracker() if processor.tracking_window is not None else None
+    masks = []
+    duration = 0.
+    for index, (frame, _) in enumerate(sequence):
+        start = time.perf_counter()
+        mask = processor.process(frame, tracker.boxes if tracker is not None else None)
+        if index >= warmup:
+            duration += time.perf_counter() - start
+            masks.append(mask)
+        if tracker is not None:
+            tracker.track(mask)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    true_positives = false_positives = false_negatives = 0
+    ious = []
+    for mask, (_, truth) in zip(masks, sequence[warmup:]):
+        if mask.shape != truth.shape:
+            mask = cv2.resize(mask, truth.shape[::-1], interpolation=cv2.INTER_NEAREST)
+        mask, truth = mask > 0, truth > 0
+        hits = np.count_nonzero(mask & truth)
+        union = np.count_nonzero(mask | truth)
+        ious.append(hits / union if union else 1.)
+        true_positives += hits
+        false_positives += np.count_nonzero(mask) - hits
+        false_negatives += np.count_nonzero(truth) - hits
+    precision = true_positives / (true_positives + false_positives) if true_positives + false_positives else 0.
+    recall = true_positives / (true_positives + false_negatives) if true_positives + false_negatives else 0.
+    return {
+        # a factory may fall back to another processor, like the c wrapper to MovingAveragePython
+        "processor": type(processor).__name__,
+        "fps": len(masks) / duration,
+        "peak_mb": peak / 2 ** 20,
+        "iou": float(np.mean(ious)),
+        "precision": precision,
+        "recall": recall,
+        "f1": 2 * precision * recall / (precision + recall) if precision + recall else 0.,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput, memory and mask quality of every background "
+                                                 "subtraction over sequences with ground truth")
+    parser.add_argument("--frames", type=int, default=90, help="measured frames of each synthetic sequence")
+    parser.add_argument("--warmup", type=int, default=30)
+    parser.add_argument("--resolutions", nargs="+", default=["320x180", "640x360", "1280x720"])
+    parser.add_argument("--histories", type=int, nargs="+", default=[10, 30])
+    parser.add_argument("--only", nargs="+", help="names of the candidates, default all")
+    parser.add_argument("--frames-dir", help="stored sequence instead of the synthetic ones, needs --masks-dir")
+    parser.add_argument("--masks-dir")
+    parser.add_argument("--output", help="writes every result to this JSON file")
+    args = parser.parse_args()
+
+    if args.frames_dir:
+        sequences = {"stored": stored_sequence(args.frames_dir, args.masks_dir)}
+    else:
+        sequences = {}
+        for resolution in args.resolutions:
+            width, height = map(int, resolution.split("x"))
+            sequences[resolution] = synthetic_sequence(width, height, args.frames + args.warmup)
+
+    results = []
+    print(f"{'candidate':<58}{'processor':>22}{'sequence':>10}{'history':>8}{'fps':>9}{'peak MB':>9}{'IoU':>7}"
+          f"{'F1':>7}")
+    for name in args.only or CANDIDATES:
+        for sequence_name, sequence in sequences.items():
+            for history in args.histories:
+                try:
+                    result = run(CANDIDATES[name], history, sequence, args.warmup)
+                except ImportError as e:
+                    # e.g. the c extension is not built
+                    print(f"{name:<58}skipped: {e}")
+                    break
+                results.append({"candidate": name, "sequence": sequence_name, "history": history, **result})
+                print(f"{name:<58}{result['processor']:>22}{sequence_name:>10}{history:>8}{result['fps']:>9.1f}"
+                      f"{result['peak_mb']:>9.1f}{result['iou']:>7.3f}{result['f1']:>7.3f}")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
@@ -0,0 +1,87 @@
+import argparse
+import os
+import threading
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+
+from detector import Config
+from detector.computer_vision import BGS
+from detector.computer_vision.ProcessBackend import ProcessBackSubProcessor
+from detector.computer_vision.Sources import SyntheticSource
+
+
+def feed(processor, frames, stop):
+    """Capture thread stand-in, applies the prepared frames at the camera fps"""
+    index = 0
+    while not stop.is_set():
+        processor.apply(frames[index % len(frames)])
+        index += 1
+        time.sleep(1 / Config.FPS)
+
+
+def game_loop(screen, seconds, entities=300):
+    """
+    Stand-in of Game.run without a cap, python work per entity and a blit per entity
+    :return: frame times in milliseconds
+    """
+    sprite = pygame.Surface((40, 40)).convert()
+    positions = [[i * 4 % Config.SCREEN_WIDTH, i * 2 % Config.SCREEN_HEIGHT] for i in range(entities)]
+    frame_times = []
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        start = time.perf_counter()
+        screen.fill((0, 0, 0))
+        for position in positions:
+            position[0] = (position[0] + 3) % Config.SCREEN_WIDTH
+            position[1] = (position[1] + 1) % Config.SCREEN_HEIGHT
+            screen.blit(sprite, position)
+        pygame.display.update()
+        frame_times.append((time.perf_counter() - start) * 1000)
+    return frame_times
+
+
+def run(backend, processor_class, seconds, processor_kwargs, frames):
+    if backend == "process":
+        processor = ProcessBackSubProcessor(processor_class, **processor_kwargs)
+    else:
+        processor = processor_class(**processor_kwargs)
+    processor.start_calculation_thread()
+    # the worker process needs a moment to start, it should not count
+    processor.apply(frames[0])
+    time.sleep(3 if backend == "process" else 0)
+
+    stop = threading.Event()
+    feeder = threading.Thread(target=feed, args=(processor, frames, stop))
+    feeder.daemon = True
+    feeder.start()
+    frame_times = game_loop(pygame.display.get_surface(), seconds)
+    stop.set()
+    feeder.join()
+    if backend == "process":
+        processor.close()
+    return frame_times
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Game loop frame times with the background subtraction "
+                                                 "in a thread or in a process")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--history", type=int, default=10)
+    args = parser.parse_args()
+
+    pygame.init()
+    pygame.display.set_mode(Config.SCREEN)
+    kwargs = {"history": args.history, "median_typ": BGS.MedianTyp.EXACT}
+    # generated beforehand, the source would compete for the GIL as well
+    source = SyntheticSource(realtime=False)
+    sequence = [source.read() for _ in range(Config.FPS)]
+
+    print(f"{'backend':<10}{'frames':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name in ("thread", "process"):
+        times = run(name, BGS.MovingAveragePython, args.seconds, kwargs, sequence)
+        p50, p95, p99 = np.percentile(times, [50, 95, 99])
+        print(f"{name:<10}{len(times):>8}{p50:>9.2f}{p95:>9.2f}{p99:>9.2f}")
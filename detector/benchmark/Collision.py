@@ -0,0 +1,79 @@
+import argparse
+import random
+import time
+
+import pygame
+
+from detector import Config
+from detector.game import Collision
+
+
+class Box:
+    """Stand-in of an entity, only what the collision stage needs"""
+    def __init__(self, x, y, size):
+        self.rect = pygame.Rect(x, y, size, size)
+        self.free2catch = True
+        self.delete = False
+        self.points = 1
+
+
+def random_boxes(count, size, seed):
+    rng = random.Random(seed)
+    return [Box(rng.randrange(Config.SCREEN_WIDTH), rng.randrange(Config.SCREEN_HEIGHT), size) for _ in range(count)]
+
+
+def nested_loop(entities, players):
+    """The collision stage before, nested loops and list.remove while iterating"""
+    for entity in entities:
+        if entity.delete:
+            entities.remove(entity)
+        elif entity.free2catch:
+            for player in players:
+                if entity.rect.colliderect(player.rect):
+                    player.points += entity.points
+                    entity.delete = True
+    return entities
+
+
+def batched(entities, players):
+    """The collision stage of Game.update_entities, compaction and one batched pass"""
+    entities = [entity for entity in entities if not entity.delete]
+    catchable = [entity for entity in entities if entity.free2catch]
+    entity_indices, player_indices = Collision.find_collisions(
+        Collision.boxes_of([entity.rect for entity in catchable]),
+        Collision.boxes_of([player.rect for player in players]))
+    for entity_index, player_index in zip(entity_indices, player_indices):
+        players[player_index].points += catchable[entity_index].points
+        catchable[entity_index].delete = True
+    return entities
+
+
+def measure(stage, count, players, frames):
+    """
+    Every frame a fresh set of entities, half of them already marked for deletion
+    :return: milliseconds per frame
+    """
+    duration = 0
+    for frame in range(frames):
+        entities = random_boxes(count, Config.TEXTURE_SIZE, frame)
+        for entity in entities[::2]:
+            entity.delete = True
+        start = time.perf_counter()
+        stage(entities, players)
+        duration += time.perf_counter() - start
+    return duration / frames * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Collision stage, nested loops against one batched pass")
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--frames", type=int, default=20)
+    parser.add_argument("--counts", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    args = parser.parse_args()
+
+    player_boxes = random_boxes(args.players, 64, -1)
+    print(f"{'entities':>10}{'nested ms':>12}{'batched ms':>12}")
+    for entity_count in args.counts:
+        nested_ms = measure(nested_loop, entity_count, player_boxes, args.frames)
+        batched_ms = measure(batched, entity_count, player_boxes, args.frames)
+        print(f"{entity_count:>10}{nested_ms:>12.3f}{batched_ms:>12.3f}")
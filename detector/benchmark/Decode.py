@@ -0,0 +1,57 @@
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from detector import Config
+from detector.computer_vision.Sources import DECODE_COLOR, DECODE_GRAYSCALE, SyntheticSource, reduction_factor
+from detector.computer_vision.Stream import jpeg_size
+
+
+def full_decode(jpeg, target_size):
+    """The decode before, at full size and resized afterwards"""
+    img = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+    return cv2.resize(img, target_size, interpolation=cv2.INTER_AREA)
+
+
+def reduced_decode(jpeg, target_size, grayscale=False):
+    flags = (DECODE_GRAYSCALE if grayscale else DECODE_COLOR)[reduction_factor(jpeg_size(jpeg), target_size)]
+    img = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), flags)
+    if img.shape[:2] != (target_size[1], target_size[0]):
+        img = cv2.resize(img, target_size, interpolation=cv2.INTER_AREA)
+    return img
+
+
+def measure(decode, jpegs, target_size, **kwargs):
+    """
+    :return: milliseconds per frame, decode and resize
+    """
+    decode(jpegs[0], target_size, **kwargs)
+    start = time.perf_counter()
+    for jpeg in jpegs:
+        decode(jpeg, target_size, **kwargs)
+    return (time.perf_counter() - start) / len(jpegs) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Jpeg decode of the camera frames at full and reduced size")
+    parser.add_argument("--frames", type=int, default=30)
+    parser.add_argument("--quality", type=int, default=80)
+    args = parser.parse_args()
+
+    screen = (Config.SCREEN_WIDTH, Config.SCREEN_HEIGHT)
+    print(f"{'camera':>10}{'target':>10}{'factor':>8}{'full ms':>9}{'reduced ms':>12}{'gray ms':>9}")
+    for camera in ((1920, 1080), (3840, 2160)):
+        source = SyntheticSource(*camera, realtime=False, frames=args.frames)
+        jpegs = []
+        while (frame := source.read()) is not None:
+            jpegs.append(cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, args.quality])[1].tobytes())
+        # the screen, and the processing scales of the background subtraction
+        for scale in (1, 0.5, 0.25):
+            target = (round(screen[0] * scale), round(screen[1] * scale))
+            print(f"{'x'.join(map(str, camera)):>10}{'x'.join(map(str, target)):>10}"
+                  f"{reduction_factor(camera, target):>8}"
+                  f"{measure(full_decode, jpegs, target):>9.2f}"
+                  f"{measure(reduced_decode, jpegs, target):>12.2f}"
+                  f"{measure(reduced_decode, jpegs, target, grayscale=True):>9.2f}")
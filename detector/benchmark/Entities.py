@@ -0,0 +1,58 @@
+import argparse
+import random
+import time
+
+import numpy as np
+
+from detector.game import Entity
+
+
+def spawn(count, seed):
+    """
+    :return: the same random entities as Entity objects and in an EntityStore
+    """
+    random.seed(seed)
+    values = [Entity.get_random_entity_values() for _ in range(count)]
+    store = Entity.EntityStore()
+    for entity_values in values:
+        store.add(*entity_values)
+    return [Entity.Entity(*entity_values) for entity_values in values], store
+
+
+def per_object(entities):
+    """The update before, one Entity.update call per entity"""
+    for entity in entities:
+        entity.update()
+
+
+def same_state(entities, store):
+    positions = np.array([entity.rect.topleft for entity in entities]).reshape(-1, 2)
+    return np.array_equal(positions, store.positions[:len(store)]) and \
+        [entity.free2catch for entity in entities] == store.free2catch[:len(store)].tolist() and \
+        [entity.delete for entity in entities] == store.delete[:len(store)].tolist()
+
+
+def measure(update, frames):
+    """
+    :return: milliseconds per frame
+    """
+    start = time.perf_counter()
+    for _ in range(frames):
+        update()
+    return (time.perf_counter() - start) / frames * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Entity update, one object per entity against the EntityStore")
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--counts", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'entities':>10}{'objects ms':>12}{'store ms':>12}{'speedup':>9}{'same':>6}")
+    for entity_count in args.counts:
+        objects, entity_store = spawn(entity_count, args.seed)
+        objects_ms = measure(lambda: per_object(objects), args.frames)
+        store_ms = measure(entity_store.update, args.frames)
+        print(f"{entity_count:>10}{objects_ms:>12.3f}{store_ms:>12.3f}{objects_ms / store_ms:>9.1f}"
+              f"{str(same_state(objects, entity_store)):>6}")
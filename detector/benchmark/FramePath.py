@@ -0,0 +1,75 @@
+import argparse
+import os
+import time
+import tracemalloc
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import cv2
+import numpy as np
+import pygame
+
+from detector import Config
+from detector.computer_vision.Cam import write_to_surface
+from detector.computer_vision.Sources import SyntheticSource
+
+
+def old_path(frame):
+    """The frame path before the buffers were preallocated, a new surface for each frame"""
+    img = cv2.resize(frame, (Config.SCREEN_WIDTH, Config.SCREEN_HEIGHT))
+    img = np.rot90(img)
+    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    return pygame.surfarray.make_surface(img).convert()
+
+
+class NewPath:
+    def __init__(self):
+        size = (Config.SCREEN_WIDTH, Config.SCREEN_HEIGHT)
+        self.resized = np.empty((size[1], size[0], 3), dtype=np.uint8)
+        self.mirrored = np.empty_like(self.resized)
+        self.surfaces = [pygame.Surface(size).convert() for _ in range(3)]
+        self.index = 0
+
+    def __call__(self, frame):
+        img = cv2.resize(frame, (Config.SCREEN_WIDTH, Config.SCREEN_HEIGHT), dst=self.resized)
+        img = cv2.flip(img, 1, dst=self.mirrored)
+        surface = self.surfaces[self.index]
+        write_to_surface(surface, img)
+        self.index = (self.index + 1) % len(self.surfaces)
+        return surface
+
+
+def measure(path, frames):
+    """
+    :return: milliseconds per frame and peak of the memory allocated meanwhile, in bytes
+    """
+    path(frames[0])
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    for frame in frames:
+        path(frame)
+    duration = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return duration / len(frames) * 1000, peak
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cost of the camera frame to surface path")
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    args = parser.parse_args()
+
+    pygame.init()
+    pygame.display.set_mode(Config.SCREEN)
+    source = SyntheticSource(args.width, args.height, realtime=False, frames=args.frames)
+    sequence = []
+    while (frame := source.read()) is not None:
+        sequence.append(frame)
+
+    print(f"{'path':<8}{'ms/frame':>10}{'peak MB':>10}")
+    for name, path in (("old", old_path), ("new", NewPath())):
+        ms, peak = measure(path, sequence)
+        print(f"{name:<8}{ms:>10.2f}{peak / 2 ** 20:>10.2f}")
@@ -0,0 +1,168 @@
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+# no display, no sound card, no human
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+os.environ["SDL_AUDIODRIVER"] = "dummy"
+# stdout is only the JSON
+os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+
+import numpy as np
+
+# the game reads the Config imported as top level module, its values are set here
+import Config
+from detector.Game import Game
+from detector.Metrics import metrics
+from detector.computer_vision.Sources import SyntheticSource
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+class ScriptedGame(Game):
+    def __init__(self, min_entities, **kwargs):
+        """
+        The game with scripted input instead of mouse or tracking:
+        every player moves on its own ellipse through the middle of the screen.
+        :param min_entities: entities kept alive at each step, more than the game spawns by itself
+        """
+        super().__init__(**kwargs)
+        self.min_entities = min_entities
+
+    def update_player_positions(self):
+        for index, player in enumerate(self.players):
+            angle = self.fps_tick / 30 + index * 2 * math.pi / len(self.players)
+            player.update_position((Config.SCREEN_WIDTH / 2 + math.cos(angle) * Config.SCREEN_WIDTH / 3,
+                                    Config.SCREEN_HEIGHT / 2 + math.sin(angle) * Config.SCREEN_HEIGHT / 3))
+
+    def step(self):
+        while len(self.entities) < self.min_entities:
+            self.entities.add_random()
+        super().step()
+
+
+def version():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def percentiles(values):
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"mean": float(np.mean(values)), "p50": float(p50), "p95": float(p95), "p99": float(p99),
+            "max": float(np.max(values))}
+
+
+def measure_frames(game, frames):
+    """
+    :return: frame times in milliseconds and simulation steps
+    """
+    frame_times = []
+    steps = 0
+    for _ in range(frames):
+        start = time.perf_counter()
+        steps += game.run_frame()
+        frame_times.append((time.perf_counter() - start) * 1000)
+    return frame_times, steps
+
+
+def measure_allocations(game, frames):
+    """
+    Own pass, tracemalloc slows every allocation down.
+    The capture thread runs meanwhile, its allocations are counted as well.
+    :return: bytes allocated on top of the memory in use, per frame, and the growth over all frames
+    """
+    tracemalloc.start()
+    start_size, _ = tracemalloc.get_traced_memory()
+    allocated = []
+    for _ in range(frames):
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        game.run_frame()
+        _, peak = tracemalloc.get_traced_memory()
+        allocated.append(peak - before)
+    end_size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return allocated, end_size - start_size
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs the game loop headless with scripted players and prints "
+                                                 "frame times and allocations as JSON")
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--warmup", type=int, default=60, help="frames before measuring, the camera starts meanwhile")
+    parser.add_argument("--alloc-frames", type=int, default=120, help="frames of the allocation pass, 0 to skip")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--players", type=int, default=Config.MAX_PLAYERS)
+    parser.add_argument("--entities", type=int, default=0, help="entities kept alive at each step")
+    parser.add_argument("--render-fps", type=int, default=0, help="0 for uncapped")
+    parser.add_argument("--no-camera", action="store_true", help="without the synthetic camera and its processing")
+    parser.add_argument("--cameras", type=int, default=1, help="synthetic cameras, each with its own processing")
+    parser.add_argument("--layout", choices=["SIDE_BY_SIDE", "COMPOSITE"], default=Config.CAMERA_LAYOUT)
+    parser.add_argument("--dirty-rects", action="store_true", help="push only the changed areas to the display")
+    parser.add_argument("--session-log", help="saves the session to this file, it replays with --entities 0 only, "
+                                              "the extra entities are not part of the game")
+    parser.add_argument("--black-box", help="keeps the last Config.BLACK_BOX_SECONDS of each camera in this file")
+    parser.add_argument("--output", help="also write the JSON to this file")
+    args = parser.parse_args()
+
+    Config.MAX_PLAYERS = args.players
+    Config.RENDER_FPS = args.render_fps
+    Config.CAMERA_LAYOUT = args.layout
+    Config.BLACK_BOX_PATH = args.black_box
+    sources = [] if args.no_camera else [SyntheticSource(silhouettes=args.players, seed=args.seed + index)
+                                         for index in range(args.cameras)]
+    game = ScriptedGame(args.entities, with_webcam=sources, dirty_rects=args.dirty_rects, seed=args.seed,
+                        session_log=args.session_log)
+
+    for _ in range(args.warmup):
+        game.run_frame()
+    metrics.reset()
+    times, simulation_steps = measure_frames(game, args.frames)
+    report = {
+        "version": version(),
+        "config": vars(args),
+        "frames": len(times),
+        "fps": len(times) / (sum(times) / 1000),
+        "steps_per_second": simulation_steps / (sum(times) / 1000),
+        "frame_ms": percentiles(times),
+        "stages_ms": metrics.summary(),
+    }
+    report["cameras"] = [{
+        "name": cap.name,
+        "processor": repr(cap.frame_processor),
+        "fps": cap.fps,
+        "frames_applied": cap.frame_processor.frames_applied,
+        "dropped_frames": cap.frame_processor.dropped_frames,
+        "drop_rate": cap.frame_processor.dropped_frames / cap.frame_processor.frames_applied
+        if cap.frame_processor.frames_applied else 0.,
+        "black_box": repr(cap.black_box),
+    } for cap in game.cams]
+    if args.alloc_frames:
+        allocations, growth = measure_allocations(game, args.alloc_frames)
+        report["allocated_bytes_per_frame"] = percentiles(allocations)
+        report["memory_growth_bytes"] = growth
+
+    if args.session_log:
+        game.session_log.save(args.session_log)
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    sys.stdout.flush()
+    # os._exit skips atexit: the worker processes of the cameras would outlive the harness,
+    # and their shared memory and semaphores would be left to the resource tracker
+    for cap in game.cams:
+        close = getattr(cap.frame_processor, "close", None)
+        if close is not None:
+            close()
+    # the capture thread is still running, the interpreter should not wait for it
+    os._exit(0)
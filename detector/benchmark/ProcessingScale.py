@@ -0,0 +1,60 @@
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from detector.computer_vision import BGS
+from detector.computer_vision.Sources import SyntheticSource
+
+
+def iou(mask, truth) -> float:
+    mask, truth = mask > 0, truth > 0
+    union = np.count_nonzero(mask | truth)
+    return np.count_nonzero(mask & truth) / union if union else 1.
+
+
+def run(typ, scale, frames, warmup):
+    """
+    Runs one processor of the registry synchronously over the frames
+    :return: class of the processor, frames per second and mean IoU of the upscaled masks with the ground truth
+    """
+    processor = BGS.BackSubProcessors.create(typ, history=10, scale=scale)
+    for frame, _ in frames[:warmup]:
+        processor.process(frame)
+    start = time.perf_counter()
+    masks = [processor.process(frame) for frame, _ in frames[warmup:]]
+    duration = time.perf_counter() - start
+    ious = [iou(cv2.resize(mask, truth.shape[::-1], interpolation=cv2.INTER_NEAREST), truth)
+            for mask, (_, truth) in zip(masks, frames[warmup:])]
+    # the registry may fall back to another processor, like the c wrapper to MovingAveragePython
+    return type(processor).__name__, len(masks) / duration, float(np.mean(ious))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput and mask quality of the background subtraction "
+                                                 "at different processing scales")
+    parser.add_argument("--frames", type=int, default=120)
+    parser.add_argument("--warmup", type=int, default=30)
+    parser.add_argument("--scales", type=float, nargs="+", default=[1., .5, .25])
+    args = parser.parse_args()
+
+    source = SyntheticSource(realtime=False, frames=args.frames + args.warmup)
+    sequence = []
+    while (frame := source.read()) is not None:
+        sequence.append((frame, source.last_mask))
+
+    print(f"{'typ':<26}{'processor':>22}{'scale':>7}{'fps':>10}{'speedup':>9}{'IoU':>8}{'IoU loss':>10}")
+    for typ in BGS.BackSubProcessors:
+        full_fps, full_iou = None, None
+        for scale in args.scales:
+            try:
+                processor, fps, mean_iou = run(typ, scale, sequence, args.warmup)
+            except ImportError as e:
+                # e.g. the c extension is not built
+                print(f"{typ.name:<26}skipped: {e}")
+                break
+            if full_fps is None:
+                full_fps, full_iou = fps, mean_iou
+            print(f"{typ.name:<26}{processor:>22}{scale:>7.2f}{fps:>10.1f}{fps / full_fps:>8.1f}x{mean_iou:>8.3f}"
+                  f"{full_iou - mean_iou:>10.3f}")
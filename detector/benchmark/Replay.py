@@ -0,0 +1,98 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+# no display, no sound card, no human
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+os.environ["SDL_AUDIODRIVER"] = "dummy"
+# stdout is only the JSON
+os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+
+import numpy as np
+
+# the game reads the Config imported as top level module, its values are set here
+import Config
+from detector.Game import Game
+from detector.SessionLog import CATCH_DTYPE, SessionLog
+
+
+class ReplayGame(Game):
+    def __init__(self, log, **kwargs):
+        """
+        The game of a SessionLog again, headless without display, sound, camera or rendering:
+        only the simulation steps with the logged player rects, as fast as they run.
+        The steps skip the stage timings and take the player boxes straight from the logged rects.
+        Only its catches are kept, the rects are the logged ones already,
+        so the catches of the replay can be compared with the logged ones.
+        :param log: the loaded SessionLog
+        """
+        Config.MAX_PLAYERS = log.players
+        super().__init__(seed=log.seed, headless=True, **kwargs)
+        self.log = log
+        self.tick = 0
+        self._catches = []
+
+    def catch(self, entity, player):
+        self._catches.append((self.tick, self.players.index(player), entity.points))
+        super().catch(entity, player)
+
+    @property
+    def catches(self) -> np.ndarray:
+        """
+        :return: array of CATCH_DTYPE like SessionLog.catches
+        """
+        return np.array(self._catches, dtype=CATCH_DTYPE)
+
+    def replay(self):
+        rects = self.log.rects
+        for tick, (tick_rects, tick_boxes) in enumerate(zip(rects.tolist(), rects)):
+            self.tick = tick
+            for player, rect in zip(self.players, tick_rects):
+                player.rect.update(rect)
+            self.step(player_boxes=tick_boxes, timed=False)
+
+
+def replay(log):
+    """
+    :return: the replayed game and the seconds its steps took
+    """
+    game = ReplayGame(log)
+    start = time.perf_counter()
+    game.replay()
+    return game, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulates a session log again at full speed and checks its "
+                                                 "catches and scores, prints the result as JSON")
+    parser.add_argument("session_log")
+    parser.add_argument("--repeat", type=int, default=1, help="replays, the fastest one is reported")
+    args = parser.parse_args()
+
+    session = SessionLog.load(args.session_log)
+    if session.screen_size != tuple(Config.SCREEN):
+        print(f"session log of a {session.screen_size} screen, the game has {Config.SCREEN}", file=sys.stderr)
+    durations = []
+    for _ in range(args.repeat):
+        replayed, duration = replay(session)
+        durations.append(duration)
+    same_catches = np.array_equal(replayed.catches, session.catches)
+    report = {
+        "session_log": args.session_log,
+        "bytes": os.path.getsize(args.session_log),
+        "seed": session.seed,
+        "players": session.players,
+        "ticks": session.ticks,
+        "session_seconds": session.ticks / session.simulation_hz,
+        "replay_seconds": min(durations),
+        "ticks_per_second": session.ticks / min(durations),
+        "catches": len(session.catches),
+        "scores": session.scores(),
+        "replayed_scores": [player.points for player in replayed.players],
+        "same_catches": same_catches,
+    }
+    print(json.dumps(report, indent=2))
+    # a replay that differs from its log is a regression
+    sys.exit(0 if same_catches else 1)
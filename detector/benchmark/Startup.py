@@ -0,0 +1,63 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+# each snippet runs in a fresh interpreter and prints its own duration in seconds
+SNIPPETS = {
+    "import BGS": """
+import time
+start = time.perf_counter()
+from detector.computer_vision import BGS
+print(time.perf_counter() - start)
+""",
+    "eager, all four processors": """
+import time
+start = time.perf_counter()
+from detector.computer_vision import BGS
+processors = [BGS.BackSubProcessors.create(typ) for typ in BGS.BackSubProcessors]
+print(time.perf_counter() - start)
+""",
+    "lazy, one processor": """
+import time
+start = time.perf_counter()
+from detector.computer_vision import BGS
+processor = BGS.BackSubProcessors.create(BGS.BackSubTyp.MOVING_AVERAGE_C_WRAPPER)
+print(time.perf_counter() - start)
+""",
+    "Game() construction": """
+import time
+start = time.perf_counter()
+from detector.Game import Game
+from detector.computer_vision.Sources import SyntheticSource
+game = Game(with_webcam=SyntheticSource())
+print(time.perf_counter() - start, flush=True)
+# the capture thread is still running, the interpreter should not wait for it
+import os
+os._exit(0)
+""",
+}
+
+
+def measure(snippet, runs):
+    env = dict(os.environ, SDL_VIDEODRIVER="dummy", SDL_AUDIODRIVER="dummy",
+               PYTHONPATH=os.pathsep.join([ROOT, os.path.join(ROOT, "detector"), os.environ.get("PYTHONPATH", "")]))
+    durations = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", snippet], env=env, cwd=os.path.join(ROOT, "detector"),
+                                capture_output=True, text=True, check=True).stdout
+        durations.append(float(output.strip().splitlines()[-1]))
+    return statistics.median(durations)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import and startup time of the background subtraction and the game")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'step':<30}{'median ms':>10}")
+    for name, code in SNIPPETS.items():
+        print(f"{name:<30}{measure(code, args.runs) * 1000:>10.1f}")
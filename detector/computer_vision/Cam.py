@@ -1,27 +1,118 @@
+import logging
 import os
+import queue
+from enum import Enum
+
 import pygame
-import requests
 import cv2
 import numpy as np
 import threading
+import time
 from moviepy.video.io.ImageSequenceClip import ImageSequenceClip
 from detector import Config
+from detector.Metrics import labeled, metrics
+from detector.computer_vision.BlackBox import BlackBox
+from detector.computer_vision.Sources import RECORDING_VIDEO, FrameSource, IpCamSource
+
+cam_logger = logging.getLogger("Cam")
+
+
+def write_to_surface(surface, img) -> None:
+    """
+    Writes a BGR or grayscale image into an existing surface of the same size, without a new surface.
+    In the usual display format (BGRX in memory) the colour conversion writes straight into the
+    pixels of the surface, otherwise the image is converted and blitted with blit_array.
+    :param surface: surface of the size of the image, must not be locked or blitted meanwhile
+    :param img: (height, width, 3) BGR or (height, width) grayscale image
+    """
+    width, height = surface.get_size()
+    if surface.get_bytesize() == 4 and surface.get_shifts()[:3] == (16, 8, 0) \
+            and surface.get_pitch() == width * 4:
+        buffer = surface.get_buffer()
+        pixels = np.frombuffer(buffer, dtype=np.uint8).reshape((height, width, 4))
+        cv2.cvtColor(img, cv2.COLOR_GRAY2BGRA if img.ndim == 2 else cv2.COLOR_BGR2BGRA, dst=pixels)
+        # the surface stays locked as long as its buffer exists
+        del pixels, buffer
+    else:
+        rgb = cv2.cvtColor(img, cv2.COLOR_GRAY2RGB if img.ndim == 2 else cv2.COLOR_BGR2RGB)
+        pygame.surfarray.blit_array(surface, rgb.transpose(1, 0, 2))
+
+
+class CameraLayout(Enum):
+    """Simple class to distinguish how the images of several cameras share the screen"""
+    # each camera gets its own column of the screen, the frame is scaled to it
+    SIDE_BY_SIDE = 0
+    # each camera covers the whole screen, the masks of all cameras are laid over each other
+    COMPOSITE = 1
+
+
+def camera_areas(count, layout=CameraLayout.SIDE_BY_SIDE) -> list:
+    """
+    :return: the area of the screen of each camera, as pygame.Rect
+    """
+    if layout == CameraLayout.COMPOSITE or count < 2:
+        return [pygame.Rect(0, 0, Config.SCREEN_WIDTH, Config.SCREEN_HEIGHT) for _ in range(count)]
+    # rounded edges, so the columns cover the screen without a gap
+    edges = [round(index * Config.SCREEN_WIDTH / count) for index in range(count + 1)]
+    return [pygame.Rect(left, 0, right - left, Config.SCREEN_HEIGHT) for left, right in zip(edges, edges[1:])]
 
 
 class OpenCVCapture:
 
-    def __init__(self, url, frame_processor=None):
+    def __init__(self, source, frame_processor=None, tracker=None, name=None, area=None, black_box=None):
         """
-        Uses a URL that belongs to an IP webcam.
-        (Within the used project via the APP IP Webcam
-        by @Pavel Khlebovich from the Android Store).
-        :param url: url to the desired Webcam
+        Fetches the frames of a source in its own thread and prepares them for the game.
+        Several captures can run next to each other, each with its own source, processor and tracker.
+        :param source: a FrameSource, like IpCamSource, VideoFileSource, ImageDirectorySource
+        or SyntheticSource. A url is used as IpCamSource, for backwards compatibility
+        :param tracker: SilhouetteTracker that finds the players in the mask of the frame_processor
+        :param name: name of the camera, its stages are recorded as e.g. capture.decode.<name>, default none
+        :param area: pygame.Rect of the screen the image is shown in, player positions are in screen
+        coordinates of it, default the whole screen
+        :param black_box: path of a BlackBox that keeps the last Config.BLACK_BOX_SECONDS of frames,
+        as they are decoded, default none
         """
-        self.url = url
+        if not isinstance(source, FrameSource):
+            source = IpCamSource(source)
+        self.source = source
+        self.frame_processor = frame_processor
+        self.name = name
+        self.area = pygame.Rect(area) if area is not None else pygame.Rect(0, 0, Config.SCREEN_WIDTH,
+                                                                           Config.SCREEN_HEIGHT)
+        self.source.label = name
+        if frame_processor is not None:
+            frame_processor.label = name
+        # the source may decode smaller frames, as long as they cover the size they are used at:
+        # the area, or the processing scale if the processed mask is shown instead
+        scale = frame_processor.scale if frame_processor is not None else 1
+        self.source.target_size = (round(self.area.width * scale), round(self.area.height * scale))
+        if frame_processor is not None:
+            # the decoded frame goes to the processor as it is, it is resized once to the processing size
+            frame_processor.processing_size = self.source.target_size
+        if frame_processor is not None and frame_processor.grayscale_input:
+            self.source.grayscale = True
         self.image = None
+        # time the frame of self.image was received by the source
+        self.image_time = None
+        # moving average of the time between two new images, in milliseconds
+        self.average_interval_ms = 0.
+        self._last_image_published = None
         self.lock = threading.Lock()  # Create a lock to protect access to self.image
-        self.frame_processor = frame_processor
-        self.frame_processor.start_calculation_thread()
+        if self.frame_processor is not None:
+            self.frame_processor.start_calculation_thread()
+        self.tracker = tracker
+        self.player_positions = []
+        # buffers of the frame path, allocated with the first frame
+        self._resized = None
+        self._mirrored = None
+        self._mask = None
+        self._surfaces = None
+        self._back_index = 0
+        # once the first mask is there only masks are shown, before it the camera frames
+        self._showing_masks = False
+        self.black_box_path = black_box
+        # created with the first frame, when its shape is known
+        self.black_box = None
 
     def get_ip_cam_img(self) -> pygame.Surface:
         """
@@ -31,38 +122,138 @@ class OpenCVCapture:
         if self.image is not None:
             return self.image
 
+    def get_ip_cam_frame(self) -> tuple:
+        """
+        :return: the image like get_ip_cam_img and the perf_counter time its frame was received
+        """
+        with self.lock:
+            return self.image, self.image_time
+
+    @property
+    def fps(self) -> float:
+        """
+        New images per second, masks once the frame processor delivers them
+        """
+        return 1000 / self.average_interval_ms if self.average_interval_ms else 0.
+
+    def get_player_positions(self) -> list:
+        """
+        :return: screen position of each tracked player, None if the player was not found
+        """
+        with self.lock:
+            return self.player_positions
+
     def fetch_image_thread(self):
+        self.source.start()
         while True:
-            # Request the webcam for a jpg
-
-            request = requests.get(f"{self.url}/shot.jpg")
-            # Decode the image
-            img_arr = np.frombuffer(request.content, dtype=np.uint8)
+            img = self.source.read()
+            if img is None:
+                if self.source.exhausted:
+                    cam_logger.info(f"{self.source} has no frames left")
+                    self.source.close()
+                    return
+                continue
 
-            img = cv2.imdecode(img_arr, cv2.IMREAD_COLOR)  # Use cv2.IMREAD_COLOR for a color image
+            frame_time = self.source.frame_time
 
-            # Resize to match the Config
-            img = cv2.resize(img, (Config.SCREEN_WIDTH, Config.SCREEN_HEIGHT))
+            if self._surfaces is None or self._resized.shape[2:] != img.shape[2:]:
+                self._allocate_buffers(img.shape[2:])
 
-            # Change the channels and rotate the image to fit the game
+            if self.black_box_path is not None:
+                # unmirrored, so a BlackBoxSource played through a capture gives the processor the same frames
+                with metrics.time(labeled("capture.black_box", self.name)):
+                    self._write_black_box(img, frame_time)
 
-            img = np.rot90(img)
+            with metrics.time(labeled("capture.mirror", self.name)):
+                # Mirror the image at its decoded size, so the player moves on the screen like in a mirror
+                if self._mirrored is None or self._mirrored.shape != img.shape:
+                    self._mirrored = np.empty_like(img)
+                img = cv2.flip(img, 1, dst=self._mirrored)
 
             if self.frame_processor is not None:
-                self.frame_processor.apply(img)
-                processed = self.frame_processor.processed_frame
-                if processed is not None:
-                    img = self.frame_processor.processed_frame
-            else:
-                img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+                player_boxes = None
+                if self.tracker is not None:
+                    # the tracker found them in the last mask, in coordinates of the area, the window of the
+                    # processor needs them in coordinates of the frame
+                    factor = img.shape[1] / self.area.width
+                    player_boxes = [None if box is None else tuple(value * factor for value in box)
+                                    for box in self.tracker.boxes]
+                self.frame_processor.apply(img, frame_time, player_boxes)
+                # a short wait for the mask of this frame, a slower one is taken with a later frame
+                result = self.frame_processor.poll(Config.BGS_RESULT_WAIT)
+                if result is not None:
+                    processed = result.mask
+                    # the mask is shown with the time of the frame it was calculated from
+                    frame_time = result.timestamp
+                    self._showing_masks = True
+                    if self.tracker is not None:
+                        with metrics.time(labeled("capture.tracking", self.name)):
+                            positions = self.tracker.track(processed, processed.shape[1] / self.area.width)
+                        if self.area.topleft != (0, 0):
+                            positions = [None if position is None else
+                                         (position[0] + self.area.x, position[1] + self.area.y)
+                                         for position in positions]
+                        with self.lock:
+                            self.player_positions = positions
+                    # only the display needs the mask at full size
+                    if processed.shape[:2] != self._mask.shape:
+                        processed = cv2.resize(processed, self.area.size, dst=self._mask,
+                                               interpolation=cv2.INTER_NEAREST)
+                    img = processed
+                elif self._showing_masks:
+                    # no new mask yet, the last one stays on the screen
+                    continue
 
-            # Make a surface of it
-            img_surface = pygame.surfarray.make_surface(img).convert()
+            if img.shape[:2] != self._resized.shape[:2]:
+                # only a camera frame that is shown is resized to the area, the frame buffers are reused
+                with metrics.time(labeled("capture.resize", self.name)):
+                    img = cv2.resize(img, self.area.size, dst=self._resized)
 
+            # Draw into the back surface, the game still shows the front surface
+            back = self._surfaces[self._back_index]
+            with metrics.time(labeled("capture.surface", self.name)):
+                write_to_surface(back, img)
 
             # Lock accesses to self.image to prevent race conditions
             with self.lock:
-                self.image = img_surface
+                self.image = back
+                self.image_time = frame_time
+            self._back_index = (self._back_index + 1) % len(self._surfaces)
+
+            now = time.perf_counter()
+            if self._last_image_published is not None:
+                interval_ms = (now - self._last_image_published) * 1000
+                self.average_interval_ms = self.average_interval_ms * .9 + interval_ms * .1 \
+                    if self.average_interval_ms else interval_ms
+            self._last_image_published = now
+
+    def _write_black_box(self, img, frame_time):
+        """
+        Copies the frame into the ring, the ring is created with the first frame and again if its shape changes
+        """
+        if self.black_box is None or self.black_box.shape != img.shape:
+            fps = self.source.fps or Config.FPS
+            # one slot more, the slot that is written next is not part of the frames that are read
+            self.black_box = BlackBox.create(self.black_box_path, round(Config.BLACK_BOX_SECONDS * fps) + 1,
+                                             img.shape)
+            cam_logger.info(f"Keeping the last {Config.BLACK_BOX_SECONDS} seconds of {self.source} "
+                            f"in {self.black_box_path}")
+        self.black_box.write(img, frame_time)
+
+    def _allocate_buffers(self, channels=(3,)):
+        """
+        Every buffer of the frame path is allocated once.
+        :param channels: (3,) for BGR frames, () for grayscale ones
+        Three surfaces, one shown by the game, one written to and one in between,
+        so a surface is never written while the game blits it.
+        """
+        size = self.area.size
+        self._resized = np.empty((size[1], size[0]) + tuple(channels), dtype=np.uint8)
+        # at the decoded size, allocated with the first frame
+        self._mirrored = None
+        self._mask = np.empty(self._resized.shape[:2], dtype=np.uint8)
+        self._surfaces = [pygame.Surface(size).convert() for _ in range(3)]
+        self._back_index = 0
 
     def start_fetching_thread(self):
         """
@@ -73,20 +264,54 @@ class OpenCVCapture:
         image_thread.start()
 
 
+class RecordMode(Enum):
+    """Simple class to distinguish how the Recorder saves the game"""
+    # a .bmp per frame, converted to a video after the game
+    FRAMES = 0
+    # frames are encoded to a .mp4 by a background thread while the game runs
+    VIDEO = 1
+
+
 class Recorder:
-    def __init__(self):
+    def __init__(self, mode=None, fps=None, queue_size=None, block_when_behind=None):
         """
             game recorder that saves individual frames via Pygame.
             Converts the frames into a video when finished properly.
             Each new game gets its own folder.
+            In RecordMode.VIDEO the game loop only copies the screen once into a bounded queue,
+            a background thread encodes the frames straight to mp4 with cv2.VideoWriter.
+            If the encoder falls behind and the queue is full, a frame is either dropped
+            (counted in dropped_frames) or the game waits for the encoder.
+        :param mode: RecordMode, default VIDEO if Config.RECORD_VIDEO is set else FRAMES
+        :param fps: frames per second of the video, default Config.FPS
+        :param queue_size: frames waiting for the encoder, default Config.RECORD_QUEUE_SIZE
+        :param block_when_behind: wait instead of dropping, default Config.RECORD_BLOCK_WHEN_BEHIND
         """
+        if mode is None:
+            mode = RecordMode.VIDEO if Config.RECORD_VIDEO else RecordMode.FRAMES
+        self.mode = mode
+        self.fps = fps if fps is not None else Config.FPS
+        self.block_when_behind = block_when_behind if block_when_behind is not None \
+            else Config.RECORD_BLOCK_WHEN_BEHIND
         self.record_dir = self.create_new_record_dir()
+        self.video_path = os.path.join(self.record_dir, RECORDING_VIDEO)
+        self.recorded_frames = 0
+        self.dropped_frames = 0
+        self._frame_queue = None
+        self._encoder_thread = None
+        if self.mode == RecordMode.VIDEO:
+            self._frame_queue = queue.Queue(maxsize=queue_size if queue_size is not None
+                                            else Config.RECORD_QUEUE_SIZE)
+            self._encoder_thread = threading.Thread(target=self._encode_thread)
+            self._encoder_thread.daemon = True
+            self._encoder_thread.start()
 
     @staticmethod
     def create_new_record_dir() -> str:
         """
         :return: string of the new dir for frames and afterwards the video
         """
+        os.makedirs(Config.RECORD_DIR, exist_ok=True)
         # counting existing dirs to evaluate the next dir number
         existing_dirs = [int(name) for name in os.listdir(Config.RECORD_DIR) if name.isdigit()]
         if existing_dirs:
@@ -104,7 +329,55 @@ class Recorder:
         :param screen: which is recorded
         :param tick: to name each frame
         """
-        pygame.image.save(screen, f"{self.record_dir}/{tick}.bmp")
+        if self.mode == RecordMode.FRAMES:
+            pygame.image.save(screen, f"{self.record_dir}/{tick}.bmp")
+            self.recorded_frames += 1
+            return
+        # the only copy of the screen in the game loop
+        if screen.get_bytesize() == 4 and screen.get_shifts()[:3] == (16, 8, 0):
+            # the usual display format is BGRX in memory, so its buffer can be copied as it is
+            frame = (bytes(screen.get_buffer()), screen.get_size(), screen.get_pitch() // 4, 4)
+        else:
+            frame = (pygame.image.tobytes(screen, "RGB"), screen.get_size(), screen.get_width(), 3)
+        if self.block_when_behind:
+            self._frame_queue.put(frame)
+        else:
+            try:
+                self._frame_queue.put_nowait(frame)
+            except queue.Full:
+                self.dropped_frames += 1
+
+    def finish(self) -> None:
+        """
+        Finishes the recording, called after the game ended.
+        Waits for the encoder in RecordMode.VIDEO, converts the frames in RecordMode.FRAMES.
+        """
+        if self.mode == RecordMode.FRAMES:
+            self.convert_to_video()
+            return
+        self._frame_queue.put(None)
+        self._encoder_thread.join()
+        cam_logger.info(f"Recorded {self.recorded_frames} frames to {self.video_path}, "
+                        f"dropped {self.dropped_frames}")
+
+    def _encode_thread(self):
+        writer = None
+        bgr = None
+        while True:
+            frame = self._frame_queue.get()
+            # None marks the end of the game
+            if frame is None:
+                break
+            data, (width, height), row_length, channels = frame
+            pixels = np.frombuffer(data, dtype=np.uint8).reshape((height, row_length, channels))[:, :width]
+            if writer is None:
+                writer = cv2.VideoWriter(self.video_path, cv2.VideoWriter_fourcc(*"mp4v"), self.fps, (width, height))
+                bgr = np.empty((height, width, 3), dtype=np.uint8)
+            cv2.cvtColor(pixels, cv2.COLOR_BGRA2BGR if channels == 4 else cv2.COLOR_RGB2BGR, dst=bgr)
+            writer.write(bgr)
+            self.recorded_frames += 1
+        if writer is not None:
+            writer.release()
 
     def convert_to_video(self) -> None:
         """
@@ -118,5 +391,5 @@ class Recorder:
         # create VideoClip
         clip = ImageSequenceClip([os.path.join(self.record_dir, frame) for frame in frames], fps=30)
         # write video clip
-        clip.write_videofile(f"{self.record_dir}/_Fruit_Ninja.mp4", codec='libx264')
+        clip.write_videofile(self.video_path, codec='libx264')
         clip.close()
@@ -0,0 +1,148 @@
+import argparse
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+
+from detector.computer_vision.Sources import SyntheticSource
+
+BOUNDARY = "FruitCutFrame"
+
+
+class MjpegServer:
+    def __init__(self, host="127.0.0.1", port=8080, fps=30, width=1280, height=720, quality=80):
+        """
+        Local stand-in for the IP Webcam app, so the capture can be tested without a phone.
+        Serves the same endpoints as the app:
+        /video a multipart mjpeg stream and /shot.jpg a single jpeg.
+        The frames come from a SyntheticSource, a silhouette walking over a static background.
+        :param fps: frames per second of the stream
+        :param quality: jpeg quality of the frames
+        """
+        self.fps = fps
+        self.width = width
+        self.height = height
+        self.quality = quality
+        self.frames_sent = 0
+        self._source = SyntheticSource(width, height, fps=fps, realtime=False)
+        self._jpeg = None
+        self._condition = threading.Condition()
+        self._running = False
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """
+        Starts serving and producing frames, both in their own daemon thread
+        """
+        self._running = True
+        self._produce_frame()
+        for target in (self._produce_frames, self._httpd.serve_forever):
+            thread = threading.Thread(target=target)
+            thread.daemon = True
+            thread.start()
+
+    def stop(self):
+        self._running = False
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        with self._condition:
+            self._condition.notify_all()
+
+    def next_jpeg(self, last_jpeg=None):
+        """
+        Waits for a frame newer than last_jpeg
+        :return: jpeg as bytes or None if the server stopped
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._jpeg is not last_jpeg or not self._running)
+            return self._jpeg if self._running else None
+
+    def _produce_frames(self):
+        while self._running:
+            time.sleep(1 / self.fps)
+            self._produce_frame()
+
+    def _produce_frame(self):
+        frame = self._source.read()
+        cv2.putText(frame, str(self._source.tick), (10, 40), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+        _, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        with self._condition:
+            self._jpeg = jpeg.tobytes()
+            self._condition.notify_all()
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/shot.jpg":
+                    self._send_shot()
+                elif self.path == "/video":
+                    self._send_stream()
+                else:
+                    self.send_error(404)
+
+            def _send_shot(self):
+                jpeg = server.next_jpeg()
+                if jpeg is None:
+                    # the server is stopped
+                    self.send_error(503)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "image/jpeg")
+                self.send_header("Content-Length", str(len(jpeg)))
+                self.end_headers()
+                self.wfile.write(jpeg)
+                server.frames_sent += 1
+
+            def _send_stream(self):
+                self.send_response(200)
+                self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}")
+                self.end_headers()
+                jpeg = None
+                try:
+                    while True:
+                        jpeg = server.next_jpeg(jpeg)
+                        if jpeg is None:
+                            break
+                        self.wfile.write(f"--{BOUNDARY}\r\n"
+                                         f"Content-Type: image/jpeg\r\n"
+                                         f"Content-Length: {len(jpeg)}\r\n\r\n".encode())
+                        self.wfile.write(jpeg)
+                        self.wfile.write(b"\r\n")
+                        server.frames_sent += 1
+                except (BrokenPipeError, ConnectionResetError):
+                    # client is gone, e.g. the capture reconnects
+                    pass
+
+            def log_message(self, format, *args):
+                # one log line per frame would flood the console
+                pass
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stand-in mjpeg server for the IP Webcam app")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    args = parser.parse_args()
+
+    mjpeg_server = MjpegServer(args.host, args.port, args.fps, args.width, args.height)
+    mjpeg_server.start()
+    print(f"Serving {mjpeg_server.url}/video and {mjpeg_server.url}/shot.jpg, set Config.IP_CAM to {mjpeg_server.url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        mjpeg_server.stop()
@@ -0,0 +1,227 @@
+import atexit
+import functools
+import logging
+import multiprocessing
+import threading
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from detector.Metrics import labeled, metrics
+from detector.computer_vision.BGS import BackSubProcessor, BackSubProcessors, BackSubTyp, create_processor, union_box
+
+process_logger = logging.getLogger("ProcessBackend")
+
+# no slot set yet
+NO_SLOT = -1
+
+
+class ProcessBackSubProcessor(BackSubProcessor):
+    def __init__(self, processor, slots=3, **processor_kwargs):
+        """
+        Runs any BackSubProcessor in its own process, so its work does not compete
+        with the game loop and the capture thread for the GIL.
+        Frames and masks are exchanged through rings of slots in shared memory,
+        only the index of a slot goes through the queue, the frames are never pickled.
+        apply(frame, timestamp, player_boxes), poll() and processed_frame work like for the processor in a thread:
+        1. apply copies the frame into a free frame slot and marks it as the latest one,
+        its sequence number, timestamp and the box around the players go into shared arrays next to it.
+        2. The worker process takes the latest slot, an older one that was not taken is skipped
+        and counted in dropped_frames.
+        3. The worker writes the mask into the next free mask slot and sends its index, the sequence number and
+        timestamp of its frame and its duration back.
+        4. The result thread copies that mask slot and publishes the copy as result and processed_frame,
+        like the processor in a thread publishes a new mask for each frame. Only then the slot is free again,
+        so the worker never writes a mask that is still read.
+        Shared memory and process are created with the first frame, when its shape is known,
+        with grayscale_input of the wrapped processor the slots hold single channel frames.
+        :param processor: BackSubTyp built by the registry, or a class of a BackSubProcessor like MogOpenCV,
+        built in the worker
+        :param slots: number of frame and mask slots, at least 3 so writing never hits a slot in use
+        :param processor_kwargs: arguments of processor_class, like history or scale
+        """
+        super().__init__(history=processor_kwargs.get("history", 10), scale=processor_kwargs.get("scale"))
+        processor_kwargs["scale"] = self.scale
+        self.name = processor.name if isinstance(processor, BackSubTyp) else processor.__name__
+        # the capture then delivers grayscale frames, and the frame slots hold a single channel
+        self.grayscale_input = (BackSubProcessors.processor_class(processor) if isinstance(processor, BackSubTyp)
+                                else processor).grayscale_input
+        # built by the worker, so it has to be pickled
+        self.processor_class = functools.partial(create_processor, processor) \
+            if isinstance(processor, BackSubTyp) else processor
+        self.processor_kwargs = processor_kwargs
+        self.slots = max(3, slots)
+        self._context = multiprocessing.get_context("spawn")
+        self._results = self._context.Queue()
+        self._frame_ready = self._context.Event()
+        self._slot_lock = self._context.Lock()
+        # mask slots the worker may write, released by the result thread once it copied the mask
+        self._free_masks = self._context.Semaphore(self.slots)
+        # slot of the newest frame and slot the worker is working on
+        self._latest_slot = self._context.Value("i", NO_SLOT, lock=False)
+        self._busy_slot = self._context.Value("i", NO_SLOT, lock=False)
+        # sequence number and timestamp of the frame in each slot
+        self._slot_sequences = self._context.Array("q", self.slots, lock=False)
+        self._slot_timestamps = self._context.Array("d", self.slots, lock=False)
+        # (x, y, width, height) around the players of each slot for the tracking_window, NaN if none was found
+        self._slot_boxes = self._context.Array("d", self.slots * 4, lock=False)
+        self._frame_memory = None
+        self._mask_memory = None
+        self._frames = None
+        self._masks = None
+        self._process = None
+        self._result_thread = None
+        # set by close, the capture thread may still call apply afterwards
+        self._closed = False
+
+    def apply(self, frame, timestamp=None, player_boxes=None):
+        timestamp = timestamp if timestamp is not None else time.perf_counter()
+        # close waits for a frame that is being copied into the shared memory
+        with self._input_lock:
+            if self._closed:
+                return self.frames_applied
+            return self._apply(frame, timestamp, player_boxes)
+
+    def _apply(self, frame, timestamp, player_boxes):
+        if self._process is None:
+            self._start_worker(frame)
+        with self._slot_lock:
+            taken = (self._latest_slot.value, self._busy_slot.value)
+        slot = next(index for index in range(self.slots) if index not in taken)
+        # neither the worker nor the next pick of the worker touches this slot
+        np.copyto(self._frames[slot], frame)
+        self.frames_applied += 1
+        self._slot_sequences[slot] = self.frames_applied
+        self._slot_timestamps[slot] = timestamp
+        # the window only needs the box around all players
+        box = union_box(player_boxes or [])
+        self._slot_boxes[slot * 4:slot * 4 + 4] = box if box is not None else (np.nan,) * 4
+        with self._slot_lock:
+            # the latest frame was not taken by the worker, it is replaced
+            if self._latest_slot.value != NO_SLOT:
+                self.dropped_frames += 1
+            self._latest_slot.value = slot
+        self._frame_ready.set()
+        return self.frames_applied
+
+    def start_calculation_thread(self):
+        # the worker process is started by the first frame, this thread collects its results
+        self._result_thread = threading.Thread(target=self._collect_results)
+        self._result_thread.daemon = True
+        self._result_thread.start()
+
+    def process(self, frame, player_boxes=None):
+        raise NotImplementedError("ProcessBackSubProcessor only works through apply")
+
+    def close(self):
+        """
+        Stops the worker and the result thread, frees the shared memory and the semaphores of the queue,
+        event and locks. Registered with atexit, a harness that leaves with os._exit has to call it itself.
+        Calling it again does nothing, apply does nothing after it
+        """
+        with self._input_lock:
+            if self._closed:
+                return
+            self._closed = True
+            if self._process is not None:
+                self._process.terminate()
+                self._process.join()
+                self._process = None
+        if self._result_thread is not None:
+            # the worker is gone, nothing else is put into the queue
+            self._results.put(None)
+            self._result_thread.join()
+            self._result_thread = None
+        self._results.close()
+        self._results.join_thread()
+        with self._calculation_lock:
+            self.processed_frame = None
+            self.result = None
+        # the arrays export the buffers, they have to go before the memory can be closed
+        self._frames = self._masks = None
+        for memory in (self._frame_memory, self._mask_memory):
+            if memory is not None:
+                memory.close()
+                memory.unlink()
+        self._frame_memory = self._mask_memory = None
+        # a semaphore is unlinked and unregistered from the resource tracker when it is garbage collected
+        self._results = self._frame_ready = self._slot_lock = self._free_masks = None
+
+    def _start_worker(self, frame):
+        if self.processing_size is not None:
+            mask_shape = (self.processing_size[1], self.processing_size[0])
+        elif self.scale != 1:
+            mask_shape = cv2.resize(np.empty(frame.shape[:2], dtype=np.uint8), None, fx=self.scale, fy=self.scale).shape
+        else:
+            mask_shape = frame.shape[:2]
+        self._frame_memory = shared_memory.SharedMemory(create=True, size=self.slots * frame.nbytes)
+        self._mask_memory = shared_memory.SharedMemory(create=True, size=self.slots * int(np.prod(mask_shape)))
+        self._frames = np.ndarray((self.slots,) + frame.shape, dtype=frame.dtype, buffer=self._frame_memory.buf)
+        self._masks = np.ndarray((self.slots,) + mask_shape, dtype=np.uint8, buffer=self._mask_memory.buf)
+        self._process = self._context.Process(
+            target=_run_worker,
+            args=(self.processor_class, self.processor_kwargs, self.processing_size, self.slots,
+                  self._frame_memory.name, frame.shape, frame.dtype.str, self._mask_memory.name, mask_shape,
+                  self._frame_ready, self._slot_lock, self._free_masks, self._latest_slot, self._busy_slot,
+                  self._slot_sequences, self._slot_timestamps, self._slot_boxes, self._results))
+        self._process.daemon = True
+        self._process.start()
+        atexit.register(self.close)
+        process_logger.info(f"Started {self.name} in process {self._process.pid}")
+
+    def _collect_results(self):
+        while True:
+            result = self._results.get()
+            if result is None:
+                # closed
+                return
+            mask_slot, sequence, timestamp, duration_ms = result
+            # the metrics of the worker process are its own, its durations are recorded here
+            metrics.record(labeled("bgs.filter", self.label), duration_ms)
+            mask = self._masks[mask_slot].copy()
+            self._free_masks.release()
+            self._publish(sequence, timestamp, mask)
+
+    def __repr__(self):
+        return f"ProcessBackSubProcessor({self.name})"
+
+
+def _run_worker(processor_class, processor_kwargs, processing_size, slots, frame_name, frame_shape, frame_dtype,
+                mask_name, mask_shape, frame_ready, slot_lock, free_masks, latest_slot, busy_slot,
+                slot_sequences, slot_timestamps, slot_boxes, results):
+    """
+    Main function of the worker process, processes the latest frame slot as long as the game runs
+    """
+    # the worker shares the resource tracker of the game, only the game unlinks the memory
+    frame_memory = shared_memory.SharedMemory(name=frame_name)
+    mask_memory = shared_memory.SharedMemory(name=mask_name)
+    frames = np.ndarray((slots,) + tuple(frame_shape), dtype=np.dtype(frame_dtype), buffer=frame_memory.buf)
+    masks = np.ndarray((slots,) + tuple(mask_shape), dtype=np.uint8, buffer=mask_memory.buf)
+    processor = processor_class(**processor_kwargs)
+    processor.processing_size = processing_size
+    mask_slot = 0
+    while True:
+        frame_ready.wait()
+        frame_ready.clear()
+        with slot_lock:
+            slot = latest_slot.value
+            latest_slot.value = NO_SLOT
+            busy_slot.value = slot
+        if slot == NO_SLOT:
+            continue
+        sequence, timestamp = slot_sequences[slot], slot_timestamps[slot]
+        box = tuple(slot_boxes[slot * 4:slot * 4 + 4])
+        player_boxes = [] if np.isnan(box[0]) else [box]
+        start = time.perf_counter()
+        mask = processor.process(frames[slot], player_boxes)
+        duration_ms = (time.perf_counter() - start) * 1000
+        with slot_lock:
+            busy_slot.value = NO_SLOT
+        # the result thread has not copied the mask of this slot yet
+        free_masks.acquire()
+        np.copyto(masks[mask_slot], mask)
+        results.put((mask_slot, sequence, timestamp, duration_ms))
+        mask_slot = (mask_slot + 1) % slots
+
@@ -0,0 +1,362 @@
+import logging
+import os
+import time
+
+import cv2
+import numpy as np
+import requests
+
+from detector import Config
+from detector.Metrics import labeled, metrics
+from detector.computer_vision.BlackBox import BlackBox
+from detector.computer_vision.Stream import CaptureMode, MjpegStream, jpeg_size
+
+source_logger = logging.getLogger("Sources")
+
+# name of the video in each dir of the Recorder, in both RecordModes
+RECORDING_VIDEO = "_Fruit_Ninja.mp4"
+
+# Flags of cv2.imdecode by how much the jpeg is shrunk while decoding
+DECODE_COLOR = {1: cv2.IMREAD_COLOR, 2: cv2.IMREAD_REDUCED_COLOR_2,
+                4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}
+DECODE_GRAYSCALE = {1: cv2.IMREAD_GRAYSCALE, 2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+                    4: cv2.IMREAD_REDUCED_GRAYSCALE_4, 8: cv2.IMREAD_REDUCED_GRAYSCALE_8}
+
+
+def reduction_factor(size, target_size) -> int:
+    """
+    :param size: (width, height) of the jpeg
+    :param target_size: (width, height) the frame is needed at
+    :return: 8, 4, 2 or 1, the most the jpeg can be shrunk while decoding and still cover the target size
+    """
+    for factor in (8, 4, 2):
+        if size[0] // factor >= target_size[0] and size[1] // factor >= target_size[1]:
+            return factor
+    return 1
+
+
+class FrameSource:
+    def __init__(self, fps=None, realtime=True):
+        """
+        Parent Class of the frame sources of OpenCVCapture.
+        A source delivers BGR frames as numpy arrays (height, width, 3), like cv2 reads them.
+        :param fps: frames per second of the source, used for pacing
+        :param realtime: True paces read() to fps, False delivers frames as fast as possible
+        """
+        self.fps = fps
+        self.realtime = realtime
+        self.exhausted = False
+        # perf_counter time the last frame was received, the start of the latency to the display
+        self.frame_time = None
+        # (width, height) the frames are needed at, a source may deliver smaller frames that still cover it
+        self.target_size = None
+        # deliver (height, width) grayscale frames, for processors that only need the luma
+        self.grayscale = False
+        # camera name in the metrics, set by OpenCVCapture when there is more than one camera
+        self.label = None
+        self._next_frame_time = None
+
+    def start(self):
+        """
+        Starts whatever the source needs in the background, called once by OpenCVCapture
+        """
+        pass
+
+    def read(self):
+        """
+        :return: the next frame or None if there is none at the moment.
+        If the source has no frames left, exhausted is set.
+        """
+        if self.realtime and self.fps:
+            self._pace()
+        self.frame_time = None
+        frame = self._read_frame()
+        if frame is None:
+            return None
+        # a source that knows when its frame arrived sets the time by itself
+        if self.frame_time is None:
+            self.frame_time = time.perf_counter()
+        # a source that can not decode to grayscale by itself is converted here
+        if self.grayscale and frame.ndim == 3:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return frame
+
+    def close(self):
+        pass
+
+    def _pace(self):
+        now = time.perf_counter()
+        if self._next_frame_time is None:
+            self._next_frame_time = now
+        elif self._next_frame_time > now:
+            time.sleep(self._next_frame_time - now)
+        else:
+            # too slow, do not try to catch up with frames that are already late
+            self._next_frame_time = max(self._next_frame_time, now - 1 / self.fps)
+        self._next_frame_time += 1 / self.fps
+
+    def _read_frame(self):
+        """
+        Should return the next frame, each source must overwrite it
+        """
+        raise NotImplementedError("Subclasses must implement _read_frame")
+
+
+class IpCamSource(FrameSource):
+    def __init__(self, url=None, mode=None):
+        """
+        Frames of an IP webcam.
+        (Within the used project via the APP IP Webcam
+        by @Pavel Khlebovich from the Android Store).
+        The camera sets the pace by itself.
+        :param url: url to the desired Webcam, default Config.IP_CAM
+        :param mode: CaptureMode, default STREAM if Config.IP_CAM_STREAM is set else POLL
+        """
+        super().__init__(realtime=False)
+        self.url = url if url is not None else Config.IP_CAM
+        if mode is None:
+            mode = CaptureMode.STREAM if Config.IP_CAM_STREAM else CaptureMode.POLL
+        self.mode = mode
+        # pooled connection for shot.jpg, also the fallback while the stream is down
+        self.session = requests.Session()
+        self.stream = None
+        if self.mode == CaptureMode.STREAM:
+            self.stream = MjpegStream(self.url)
+
+    def start(self):
+        if self.stream is not None:
+            self.stream.start_reading_thread()
+
+    def fetch_jpeg(self):
+        """
+        Newest jpeg of the webcam.
+        In stream mode it waits for the next frame of the stream,
+        while the stream is not connected shot.jpg is polled instead.
+        :return: jpeg as bytes or None if the webcam is not reachable
+        """
+        if self.stream is not None and self.stream.connected:
+            jpeg = self.stream.read(timeout=self.stream.timeout)
+            if jpeg is not None:
+                return jpeg
+        try:
+            # Request the webcam for a jpg
+            request = self.session.get(f"{self.url}/shot.jpg", timeout=Config.IP_CAM_TIMEOUT)
+            request.raise_for_status()
+            return request.content
+        except requests.RequestException as e:
+            source_logger.warning(f"Webcam {self.url} not reachable: {e}")
+            time.sleep(Config.IP_CAM_RECONNECT_DELAY)
+            return None
+
+    def _read_frame(self):
+        with metrics.time(labeled("capture.fetch", self.label)):
+            jpeg = self.fetch_jpeg()
+        if jpeg is None:
+            return None
+        self.frame_time = time.perf_counter()
+        # Decode the image
+        with metrics.time(labeled("capture.decode", self.label)):
+            img_arr = np.frombuffer(jpeg, dtype=np.uint8)
+            return cv2.imdecode(img_arr, self.decode_flags(jpeg))
+
+    def decode_flags(self, jpeg):
+        """
+        A jpeg much larger than the target size is shrunk by the decoder,
+        its skipped work is much cheaper than decoding at full size and resizing afterwards.
+        :return: IMREAD_(REDUCED_)COLOR or, if grayscale is set, IMREAD_(REDUCED_)GRAYSCALE
+        """
+        flags = DECODE_GRAYSCALE if self.grayscale else DECODE_COLOR
+        size = jpeg_size(jpeg) if self.target_size is not None else None
+        if size is None:
+            return flags[1]
+        return flags[reduction_factor(size, self.target_size)]
+
+    def __repr__(self):
+        return f"IpCamSource({self.url}, {self.mode.name})"
+
+
+class VideoFileSource(FrameSource):
+    def __init__(self, path, realtime=True, loop=False):
+        """
+        Frames of a local video file, everything cv2.VideoCapture can open
+        :param path: path to the video
+        :param loop: starts again at the first frame when the video ends
+        """
+        self.path = path
+        self.loop = loop
+        self._capture = cv2.VideoCapture(path)
+        if not self._capture.isOpened():
+            raise FileNotFoundError(f"Could not open video {path}")
+        fps = self._capture.get(cv2.CAP_PROP_FPS) or Config.FPS
+        super().__init__(fps=fps, realtime=realtime)
+
+    def _read_frame(self):
+        success, frame = self._capture.read()
+        if not success and self.loop:
+            self._capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            success, frame = self._capture.read()
+        if not success:
+            self.exhausted = True
+            return None
+        return frame
+
+    def close(self):
+        self._capture.release()
+
+    def __repr__(self):
+        return f"VideoFileSource({self.path})"
+
+
+class ImageDirectorySource(FrameSource):
+    def __init__(self, directory, fps=None, realtime=True, loop=False):
+        """
+        Frames of a directory of numbered images, like the res/Capture/<n> dirs the Recorder creates
+        in RecordMode.FRAMES before they are converted. For any recording dir use recording_source.
+        The images are read in the order of their number, 1.bmp, 2.bmp, ...
+        :param directory: dir of the frames
+        :param fps: frames per second of the recording, default Config.FPS
+        :param loop: starts again at the first frame when all frames were read
+        """
+        super().__init__(fps=fps if fps is not None else Config.FPS, realtime=realtime)
+        self.directory = directory
+        self.loop = loop
+        names = [name for name in os.listdir(directory) if os.path.splitext(name)[0].isdigit()]
+        self.frames = [os.path.join(directory, name)
+                       for name in sorted(names, key=lambda x: int(os.path.splitext(x)[0]))]
+        if not self.frames:
+            raise FileNotFoundError(f"No numbered frames in {directory}")
+        self._index = 0
+
+    def _read_frame(self):
+        if self._index >= len(self.frames):
+            if not self.loop:
+                self.exhausted = True
+                return None
+            self._index = 0
+        frame = cv2.imread(self.frames[self._index], cv2.IMREAD_COLOR)
+        self._index += 1
+        return frame
+
+    def __repr__(self):
+        return f"ImageDirectorySource({self.directory})"
+
+
+def recording_source(record_dir, realtime=True, loop=False) -> FrameSource:
+    """
+    :param record_dir: a res/Capture/<n> dir of the Recorder
+    :return: the video of the recording, the numbered frames if there is no video (yet)
+    """
+    video_path = os.path.join(record_dir, RECORDING_VIDEO)
+    if os.path.exists(video_path):
+        return VideoFileSource(video_path, realtime=realtime, loop=loop)
+    return ImageDirectorySource(record_dir, realtime=realtime, loop=loop)
+
+
+class BlackBoxSource(FrameSource):
+    def __init__(self, path, realtime=True, loop=False):
+        """
+        Frames of a black box, a dump or the ring of a running or crashed game, see BlackBox.py.
+        The frames were taken as they were decoded, before the mirroring of the capture,
+        so played through an OpenCVCapture the frame processor gets the same frames as back then.
+        :param path: path to the black box
+        :param loop: starts again at the oldest frame when all frames were read
+        """
+        self.path = path
+        self.loop = loop
+        self.black_box = BlackBox.open(path)
+        self.frames = len(self.black_box)
+        if not self.frames:
+            raise ValueError(f"No frames in {path}")
+        first, last = self.black_box.frame(0)[1], self.black_box.frame(self.frames - 1)[1]
+        # the frame rate the camera had while it was recorded
+        fps = (self.frames - 1) / (last - first) if last > first else Config.FPS
+        super().__init__(fps=fps, realtime=realtime)
+        self._index = 0
+
+    def _read_frame(self):
+        if self._index >= self.frames:
+            if not self.loop:
+                self.exhausted = True
+                return None
+            self._index = 0
+        # a copy, the capture may keep the frame while the file is closed
+        frame = self.black_box.frame(self._index)[0].copy()
+        self._index += 1
+        return frame
+
+    def __repr__(self):
+        return f"BlackBoxSource({self.path}, {self.frames} frames)"
+
+
+class SyntheticSource(FrameSource):
+    def __init__(self, width=None, height=None, fps=None, realtime=True, frames=None, silhouettes=1,
+                 noise=8, seed=0, color=(30, 30, 200)):
+        """
+        Generates a static background with silhouettes walking over it.
+        Needs neither a network nor files, so the pipeline can be tested and load-tested anywhere.
+        The mask of the silhouettes of the last frame is kept as ground truth in last_mask.
+        :param width: width of the frames, default Config.SCREEN_WIDTH
+        :param height: height of the frames, default Config.SCREEN_HEIGHT
+        :param fps: frames per second, default Config.FPS
+        :param frames: number of frames until the source is exhausted, None for endless
+        :param silhouettes: number of silhouettes, e.g. one per player
+        :param noise: strength of the sensor noise added to each frame
+        :param seed: seed of the noise and the paths of the silhouettes
+        :param color: BGR color of the silhouettes, the default one is close to the gray of the background in places
+        """
+        super().__init__(fps=fps if fps is not None else Config.FPS, realtime=realtime)
+        self.width = width if width is not None else Config.SCREEN_WIDTH
+        self.height = height if height is not None else Config.SCREEN_HEIGHT
+        self.frames = frames
+        self.tick = 0
+        self.last_mask = None
+
+        rng = np.random.default_rng(seed)
+        self._background = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        self._background[:] = np.linspace(40, 160, self.width, dtype=np.uint8)[np.newaxis, :, np.newaxis]
+        self._background[..., 1] = np.linspace(60, 120, self.height, dtype=np.uint8)[:, np.newaxis]
+        # a few noise patterns are cycled, new noise for each frame would cost more than the rest
+        self._noise = [rng.integers(-noise, noise + 1, self._background.shape, dtype=np.int16)
+                       for _ in range(4)] if noise else None
+        # period in frames and phase of each silhouette
+        self._paths = [(int(rng.integers(3, 7) * self.fps), rng.random()) for _ in range(silhouettes)]
+        self._frame = np.empty_like(self._background)
+        self._mask = np.empty((self.height, self.width), dtype=np.uint8)
+        self._color = color
+
+    def silhouette_centers(self, tick=None):
+        """
+        :return: list of (x, y) of the centre of each silhouette at tick, default the current tick
+        """
+        tick = self.tick if tick is None else tick
+        centers = []
+        for period, phase in self._paths:
+            position = abs(((tick / period + phase) % 1) * 2 - 1)
+            centers.append((int(self.width * (0.15 + 0.7 * position)), self.height // 2))
+        return centers
+
+    def _read_frame(self):
+        if self.frames is not None and self.tick >= self.frames:
+            self.exhausted = True
+            return None
+        self._mask[:] = 0
+        for center in self.silhouette_centers():
+            self._draw_silhouette(self._mask, center, 255)
+        if self._noise is not None:
+            noisy = self._background + self._noise[self.tick % len(self._noise)]
+            np.clip(noisy, 0, 255, out=noisy)
+            self._frame[:] = noisy
+        else:
+            self._frame[:] = self._background
+        self._frame[self._mask > 0] = self._color
+        self.last_mask = self._mask.copy()
+        self.tick += 1
+        return self._frame.copy()
+
+    def _draw_silhouette(self, img, center, color):
+        x, y = center
+        cv2.ellipse(img, (x, y + self.height // 8), (self.width // 20, self.height // 3), 0, 0, 360, color, -1)
+        cv2.circle(img, (x, y - self.height // 4), self.height // 12, color, -1)
+
+    def __repr__(self):
+        return f"SyntheticSource({self.width}x{self.height}, {self.fps} fps)"
@@ -0,0 +1,163 @@
+import logging
+import threading
+import time
+from enum import Enum
+
+import requests
+
+from detector import Config
+
+stream_logger = logging.getLogger("Stream")
+
+# Start and end marker of a jpeg
+JPEG_SOI = b"\xff\xd8"
+JPEG_EOI = b"\xff\xd9"
+
+
+class CaptureMode(Enum):
+    """Simple class to distinguish how the frames are fetched from the IP webcam"""
+    # one long-lived connection to the mjpeg stream (/video), polling shot.jpg as fallback
+    STREAM = 0
+    # a request to /shot.jpg for each frame
+    POLL = 1
+
+
+def split_jpeg_frames(buffer: bytearray) -> list:
+    """
+    Takes every complete jpeg out of the buffer of a multipart mjpeg stream.
+    The consumed bytes are removed from the buffer, an incomplete frame stays for the next chunk.
+    If a part has a Content-Length header it is used, otherwise the frame ends at the EOI marker.
+    :param buffer: received bytes of the stream, will be changed in place
+    :return: list of complete jpegs as bytes, oldest first
+    """
+    frames = []
+    while True:
+        start = buffer.find(JPEG_SOI)
+        if start < 0:
+            break
+        length = _content_length(buffer, start)
+        if length is not None:
+            end = start + length
+            if len(buffer) < end:
+                break
+        else:
+            end = buffer.find(JPEG_EOI, start + len(JPEG_SOI))
+            if end < 0:
+                break
+            end += len(JPEG_EOI)
+        frames.append(bytes(buffer[start:end]))
+        del buffer[:end]
+    return frames
+
+
+def jpeg_size(jpeg: bytes):
+    """
+    Reads the size of a jpeg from its start of frame header, without decoding it
+    :return: (width, height) or None if there is no start of frame
+    """
+    index = len(JPEG_SOI)
+    while index + 9 <= len(jpeg):
+        if jpeg[index] != 0xFF:
+            return None
+        marker = jpeg[index + 1]
+        # 0xFF in front of a marker is padding
+        if marker == 0xFF:
+            index += 1
+            continue
+        # SOF0 to SOF15, except DHT, JPG and DAC which share the range
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height = int.from_bytes(jpeg[index + 5:index + 7], "big")
+            width = int.from_bytes(jpeg[index + 7:index + 9], "big")
+            return width, height
+        # markers without a payload
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            index += 2
+            continue
+        index += 2 + int.from_bytes(jpeg[index + 2:index + 4], "big")
+    return None
+
+
+def _content_length(buffer: bytearray, start: int):
+    """
+    :return: Content-Length of the part header in front of start or None
+    """
+    header_start = buffer.rfind(b"Content-Length:", 0, start)
+    if header_start < 0:
+        return None
+    header_end = buffer.find(b"\r\n", header_start, start)
+    if header_end < 0:
+        return None
+    try:
+        return int(buffer[header_start + len(b"Content-Length:"):header_end])
+    except ValueError:
+        return None
+
+
+class MjpegStream:
+    def __init__(self, url, timeout=None, reconnect_delay=None, chunk_size=16384):
+        """
+        Holds one long-lived connection to the mjpeg endpoint (/video) of the IP webcam.
+        A separate thread reads the multipart stream, splits the jpegs out of it
+        and only keeps the newest one. If the connection drops it reconnects by itself.
+        :param url: url to the desired Webcam
+        :param timeout: timeout of connecting and reading in seconds, default Config.IP_CAM_TIMEOUT
+        :param reconnect_delay: seconds to wait before reconnecting, default Config.IP_CAM_RECONNECT_DELAY
+        :param chunk_size: bytes read from the socket at once
+        """
+        self.url = url
+        self.timeout = timeout if timeout is not None else Config.IP_CAM_TIMEOUT
+        self.reconnect_delay = reconnect_delay if reconnect_delay is not None else Config.IP_CAM_RECONNECT_DELAY
+        self.chunk_size = chunk_size
+        self.session = requests.Session()
+        self.connected = False
+        self.frames_received = 0
+        self.reconnects = 0
+        self._latest = None
+        self._latest_id = 0
+        self._read_id = 0
+        self._condition = threading.Condition()
+
+    def start_reading_thread(self):
+        reading_thread = threading.Thread(target=self._read_stream)
+        reading_thread.daemon = True
+        reading_thread.start()
+
+    def read(self, timeout=None):
+        """
+        Waits for a jpeg that was not read before.
+        Frames that arrived in between are skipped, only the newest one is returned.
+        :param timeout: seconds to wait, None waits forever
+        :return: newest jpeg as bytes or None if there was no new one in time
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._latest_id != self._read_id, timeout):
+                return None
+            self._read_id = self._latest_id
+            return self._latest
+
+    def _read_stream(self):
+        while True:
+            try:
+                with self.session.get(f"{self.url}/video", stream=True, timeout=self.timeout) as response:
+                    response.raise_for_status()
+                    self.connected = True
+                    stream_logger.info(f"Connected to mjpeg stream {self.url}/video")
+                    buffer = bytearray()
+                    for chunk in response.iter_content(self.chunk_size):
+                        buffer += chunk
+                        frames = split_jpeg_frames(buffer)
+                        if frames:
+                            # older frames in the same chunk are outdated already
+                            self._publish(frames[-1], len(frames))
+            except requests.RequestException as e:
+                stream_logger.warning(f"Mjpeg stream {self.url}/video lost: {e}")
+            self.connected = False
+            self.reconnects += 1
+            time.sleep(self.reconnect_delay)
+
+    def _publish(self, jpeg, count):
+        with self._condition:
+            self._latest = jpeg
+            self._latest_id += 1
+            self.frames_received += count
+            self._condition.notify_all()
@@ -0,0 +1,89 @@
+import time
+
+import cv2
+import numpy as np
+
+from detector import Config
+
+
+class SilhouetteTracker:
+    def __init__(self, max_players=None, min_area=None, work_scale=None, kernel_size=5):
+        """
+        Finds the players in the foreground mask of a BackSubProcessor.
+        1. The mask is downscaled by work_scale, a player is much larger than a pixel anyway.
+        2. An opening removes the noise, a closing fills the holes of the silhouettes.
+        3. cv2.connectedComponentsWithStats labels the silhouettes in one pass,
+        its centroids are the first order image moments (m10 / m00, m01 / m00) of each component.
+        4. The largest components become the players, matched to the positions of the last frame
+        so a player keeps its index while moving.
+        :param max_players: number of silhouettes that are tracked, default Config.MAX_PLAYERS
+        :param min_area: smallest silhouette as part of the mask area, default Config.TRACKING_MIN_AREA
+        :param work_scale: scale of the mask while tracking, default Config.TRACKING_SCALE
+        :param kernel_size: size of the morphology kernel at work_scale
+        """
+        self.max_players = max_players if max_players is not None else Config.MAX_PLAYERS
+        self.min_area = min_area if min_area is not None else Config.TRACKING_MIN_AREA
+        self.work_scale = work_scale if work_scale is not None else Config.TRACKING_SCALE
+        self._kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (kernel_size, kernel_size))
+        self.positions = []
+        # (x, y, width, height) of each player in coordinates of the full frame, None like its position
+        self.boxes = []
+        # duration of the last track call and a moving average of it, in milliseconds
+        self.last_duration_ms = 0.
+        self.average_duration_ms = 0.
+
+    def track(self, mask, mask_scale=1., offset=(0, 0)) -> list:
+        """
+        :param mask: foreground mask, 0 is background
+        :param mask_scale: scale of the mask to the full frame, e.g. the processing scale of a BackSubProcessor
+        :param offset: (x, y) of the mask in the whole mask if it is only a part of it, in pixels of the mask.
+        The players are matched in coordinates of the full frame, so a part at another place in each frame works too
+        :return: list of (x, y) centroids in coordinates of the full frame, one per player index,
+        None for a player that was not found
+        """
+        start = time.perf_counter()
+        # a mask that is already small enough is not scaled any further
+        resize = min(1., self.work_scale / mask_scale)
+        small = cv2.resize(mask, None, fx=resize, fy=resize, interpolation=cv2.INTER_NEAREST)
+        cv2.morphologyEx(small, cv2.MORPH_OPEN, self._kernel, dst=small)
+        cv2.morphologyEx(small, cv2.MORPH_CLOSE, self._kernel, dst=small)
+        _, _, stats, centroids = cv2.connectedComponentsWithStats(small, connectivity=8)
+
+        # label 0 is the background
+        areas = stats[1:, cv2.CC_STAT_AREA]
+        largest = np.argsort(areas)[::-1][:self.max_players]
+        min_pixels = self.min_area * small.size
+        labels = [label for label in largest if areas[label] >= min_pixels]
+        offset = np.asarray(offset, dtype=np.float64)
+        found = [tuple((centroids[label + 1] / resize + offset) / mask_scale) for label in labels]
+        box_of = {centroid: tuple(np.concatenate(((stats[label + 1, :2] / resize + offset) / mask_scale,
+                                                  stats[label + 1, 2:4] / (resize * mask_scale))))
+                  for centroid, label in zip(found, labels)}
+        self.positions = self._match(found)
+        self.boxes = [None if position is None else box_of.get(position) for position in self.positions]
+
+        self.last_duration_ms = (time.perf_counter() - start) * 1000
+        self.average_duration_ms = self.average_duration_ms * .9 + self.last_duration_ms * .1
+        return self.positions
+
+    def _match(self, found) -> list:
+        """
+        Greedy matching of the found centroids to the positions of the last frame.
+        A lost silhouette keeps its index as None, so the other players keep theirs,
+        a new silhouette takes the first free index.
+        """
+        matched = [None] * len(self.positions)
+        remaining = list(found)
+        pairs = sorted((np.hypot(new[0] - old[0], new[1] - old[1]), old_index, new)
+                       for old_index, old in enumerate(self.positions) if old is not None
+                       for new in found)
+        for _, old_index, new in pairs:
+            if matched[old_index] is None and new in remaining:
+                matched[old_index] = new
+                remaining.remove(new)
+        for new in remaining:
+            if None in matched:
+                matched[matched.index(None)] = new
+            else:
+                matched.append(new)
+        return matched
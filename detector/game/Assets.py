@@ -0,0 +1,69 @@
+import os
+
+import pygame
+
+import Config
+
+# Every file that can belong to one entity texture, e.g. apple, apple_half_1, apple_small
+TEXTURE_VARIANTS = ("", "_half_1", "_half_2", "_small", "_half_1_small", "_half_2_small")
+
+
+class TextureAtlas:
+    def __init__(self, texture_sets=None, default_size=None):
+        """
+        Holds every texture of the entities as pygame surfaces, converted to the display format.
+        It should be loaded once after pygame.display.set_mode, from then on every entity
+        only gets a reference to an already decoded and converted surface.
+        Textures that were not loaded beforehand are loaded on demand.
+        :param texture_sets: dict of size -> directory, default Config.TEXTURE_SETS
+        :param default_size: size set used when no size is given, default Config.TEXTURE_SIZE
+        """
+        self.texture_sets = texture_sets if texture_sets is not None else Config.TEXTURE_SETS
+        self.default_size = default_size if default_size is not None else Config.TEXTURE_SIZE
+        # (name, size) -> pygame.Surface
+        self._textures = {}
+
+    def load(self, names) -> None:
+        """
+        Loads each name with all its variants of all size sets
+        :param names: base names of the textures, like apple
+        """
+        for size in self.texture_sets:
+            for name in names:
+                for variant in TEXTURE_VARIANTS:
+                    path = self._path(f"{name}{variant}", size)
+                    # not every entity has every variant, a bomb is never cut in half
+                    if os.path.isfile(path):
+                        self._textures[(f"{name}{variant}", size)] = self._load_surface(path)
+
+    def get(self, name, size=None) -> pygame.Surface:
+        """
+        :param name: name of the texture, like apple or apple_half_1
+        :param size: size set of the texture, default self.default_size
+        :return: the shared surface, must not be drawn on
+        """
+        if size is None:
+            size = self.default_size
+        texture = self._textures.get((name, size))
+        if texture is None:
+            texture = self._load_surface(self._path(name, size))
+            self._textures[(name, size)] = texture
+        return texture
+
+    def __len__(self):
+        return len(self._textures)
+
+    def _path(self, name, size) -> str:
+        return os.path.join(self.texture_sets[size], f"{name}.png")
+
+    @staticmethod
+    def _load_surface(path) -> pygame.Surface:
+        surface = pygame.image.load(path)
+        # without a display there is no format to convert to
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert_alpha()
+        return surface
+
+
+# Shared atlas of the game, loaded in Game.__init__
+texture_atlas = TextureAtlas()
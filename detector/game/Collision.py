@@ -0,0 +1,31 @@
+import numpy as np
+
+
+def boxes_of(rects) -> np.ndarray:
+    """
+    :param rects: pygame Rects or (x, y, width, height) sequences
+    :return: (n, 4) int array of x, y, width, height
+    """
+    return np.array(rects, dtype=np.int64).reshape(-1, 4)
+
+
+def find_collisions(entity_boxes: np.ndarray, player_boxes: np.ndarray):
+    """
+    Finds every overlapping pair of entity and player in one batched pass.
+    Same rule as pygame.Rect.colliderect: the boxes overlap if they share an area,
+    touching edges and boxes without width or height do not collide.
+    There are only a few players, so all entities are compared to all players at once.
+    :param entity_boxes: (n, 4) array of x, y, width, height
+    :param player_boxes: (m, 4) array of x, y, width, height
+    :return: entity indices and player indices of the colliding pairs, ordered by entity and then player
+    """
+    if len(entity_boxes) == 0 or len(player_boxes) == 0:
+        empty = np.empty(0, dtype=np.intp)
+        return empty, empty
+    # the boxes overlap if the larger start is before the smaller end, in x and in y,
+    # this never holds for a box without width or height
+    entity_start = entity_boxes[:, np.newaxis, :2]
+    player_start = player_boxes[:, :2]
+    overlap = np.maximum(entity_start, player_start) < np.minimum(entity_start + entity_boxes[:, np.newaxis, 2:],
+                                                                  player_start + player_boxes[:, 2:])
+    return np.nonzero(overlap[..., 0] & overlap[..., 1])
@@ -1,35 +1,36 @@
 import random
 from enum import Enum
 
+import numpy as np
 import pygame
 
-import Config
-from detector.game.Utils import calculate_random_parabola
+from detector.game.Assets import texture_atlas
+from detector.game.Utils import Trajectory, calculate_random_parabola, evaluate_trajectories
 
 
 class Entity(pygame.sprite.Sprite):
-    def __init__(self, image, x_values, y_values, speed, points):
+    def __init__(self, image, trajectory, speed, points):
         """
         Every entity that has ever existed should inherit from this.
         Every entity inheriting from this can be rendered by pygame and will be updated by the game.
-        These entities have "x" and "y" values. It has an array of x and y values. This array represents a parabola of
-        their path on the screen.
+        These entities have "x" and "y" values. Its trajectory represents a parabola of their path on the screen,
+        the x and y value of each tick are evaluated from it.
 
         Future "cut" units have yet to override this behavior
-        :param image: name of the image, like apple. Everything else is set or can be changed in Config.TEXTURE_DIR
-        :param x_values: represents each x value on its parabolic way
-        :param y_values:represents each y value on its parabolic way
+        :param image: name of the image, like apple. The surface is shared from the texture atlas,
+        its size set can be changed in Config.TEXTURE_SIZE
+        :param trajectory: Utils.Trajectory of its parabolic way
         :param speed: should in future configure speed of types
         """
         self.points = points
         self.image_name = image
-        self.image = pygame.image.load(f"{Config.TEXTURE_DIR}{image}.png")
+        self.image = texture_atlas.get(image)
         pygame.sprite.Sprite.__init__(self)
         self.rect = self.image.get_rect()
-        self.x_values, self.y_values = x_values, y_values
+        self.trajectory = trajectory
         # Every entity has its own ticker for its x and y values
         self.current_tick = 0
-        self.rect.x, self.rect.y = x_values[0], y_values[0]
+        self.rect.x, self.rect.y = map(float, trajectory.at(0))
         self.previous_y = 0
         self.speed = speed
         # if set true this entity will be removed from the main game sprite group and its entity list
@@ -49,8 +50,7 @@ class Entity(pygame.sprite.Sprite):
         """
         self.current_tick += 1
         # if its calculated way is over
-        if len(self.x_values) <= self.current_tick or \
-                len(self.y_values) <= self.current_tick:
+        if self.trajectory.duration <= self.current_tick:
             self.delete = True
         # collide with the player -> catched or explosion
         elif self.collision:
@@ -58,8 +58,9 @@ class Entity(pygame.sprite.Sprite):
         else:
             # set the new x and y values
             previous_y = self.rect[1]
-            self.rect[0] = self.x_values[self.current_tick]
-            self.rect[1] = self.y_values[self.current_tick]
+            x, y = self.trajectory.at(self.current_tick)
+            self.rect[0] = float(x)
+            self.rect[1] = float(y)
             # now the entity reached its highest y value
             # and can be catched
             if previous_y < self.rect[1]:
@@ -69,14 +70,14 @@ class Entity(pygame.sprite.Sprite):
 class HitEnemy(Entity):
     """DEPRECATED AT THIS MOMENT"""
 
-    def __init__(self, image, x_values, y_values, speed, part):
+    def __init__(self, image, trajectory, speed, part):
         """
         FUTURE: Bombs or split Fruits that should not be noted anymore
 
         Should not be called from other than Entity itself!
         Only Represent "images" from the cuttet Fruit or the exploding Bomb
         """
-        super().__init__(f"{image}_half_{part}", x_values, y_values, speed)
+        super().__init__(f"{image}_half_{part}", trajectory, speed)
 
 
 class EntityTyp(Enum):
@@ -100,7 +101,10 @@ ENTITY_CONFIG = {
 }
 
 
-def get_random_entity():
+def get_random_entity_values():
+    """
+    :return: name, trajectory, speed and points of a random entity
+    """
     # random choice of entities
     rand_entity = random.choice(list(EntityTyp))
     # name of the entity
@@ -110,6 +114,215 @@ def get_random_entity():
     speed = concrete_entity["speed"]
     points = concrete_entity["points"]
     # calculate a random parabola for the entities way
-    parabola_array = calculate_random_parabola(speed)
-    # return the entity
-    return Entity(entity_name, parabola_array[0], parabola_array[1], speed, points)
+    trajectory = calculate_random_parabola(speed)
+    return entity_name, trajectory, speed, points
+
+
+def get_random_entity():
+    return Entity(*get_random_entity_values())
+
+
+class EntityView:
+    """
+    Thin view of one entity in an EntityStore, it holds nothing but the index.
+    It is only valid until the next EntityStore.compact, which moves the entities.
+    """
+    __slots__ = ("store", "index")
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+    @property
+    def image_name(self):
+        return self.store.names[self.index]
+
+    @property
+    def image(self):
+        return self.store.images[self.index]
+
+    @property
+    def rect(self):
+        return pygame.Rect(*self.store.positions[self.index], *self.store.sizes[self.index])
+
+    @property
+    def points(self):
+        return int(self.store.points[self.index])
+
+    @property
+    def speed(self):
+        return int(self.store.speeds[self.index])
+
+    @property
+    def trajectory(self):
+        index = self.index
+        store = self.store
+        return Trajectory(store.start_x[index], store.end_x[index], store.vertex[index], store.highest_point[index],
+                          store.a[index], int(store.durations[index]))
+
+    @property
+    def current_tick(self):
+        return int(self.store.ticks[self.index])
+
+    @property
+    def free2catch(self):
+        return bool(self.store.free2catch[self.index])
+
+    @property
+    def delete(self):
+        return bool(self.store.delete[self.index])
+
+    @delete.setter
+    def delete(self, value):
+        self.store.delete[self.index] = value
+
+
+class EntityStore:
+    def __init__(self, capacity=64):
+        """
+        Keeps all entities of the game as struct of arrays instead of one Entity sprite each.
+        Positions, ticks, speeds, points and flags are rows of contiguous numpy arrays,
+        of the paths only the parameters of their trajectory are kept.
+        update evaluates the ways of all entities in one vectorized step, draw blits all of them in one call.
+        Live entities are always the rows 0 to len - 1, compact closes the gaps of deleted ones.
+        Indexing returns an EntityView, e.g. store[0].points.
+        :param capacity: number of rows at the start, doubled when they are not enough
+        """
+        self._count = 0
+        # the surfaces can not go into an array, they are kept in lists of the same order
+        self.names = []
+        self.images = []
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        # x, y, width and height side by side, positions and sizes are views of it, so the box of an entity is a row
+        boxes = np.zeros((capacity, 4), dtype=np.int64)
+        arrays = {
+            "positions": boxes[:, :2],
+            # positions before the last update, to draw between two steps
+            "previous_positions": np.zeros((capacity, 2), dtype=np.int64),
+            "sizes": boxes[:, 2:],
+            "ticks": np.zeros(capacity, dtype=np.int64),
+            "durations": np.zeros(capacity, dtype=np.int64),
+            "speeds": np.zeros(capacity, dtype=np.int64),
+            "points": np.zeros(capacity, dtype=np.int64),
+            "delete": np.zeros(capacity, dtype=bool),
+            "free2catch": np.zeros(capacity, dtype=bool),
+            "start_x": np.zeros(capacity, dtype=np.float64),
+            "end_x": np.zeros(capacity, dtype=np.float64),
+            "vertex": np.zeros(capacity, dtype=np.float64),
+            "highest_point": np.zeros(capacity, dtype=np.float64),
+            "a": np.zeros(capacity, dtype=np.float64),
+        }
+        self._columns = tuple(arrays)
+        self._boxes = boxes
+        for name, array in arrays.items():
+            previous = getattr(self, name, None)
+            if previous is not None:
+                array[:self._count] = previous[:self._count]
+            setattr(self, name, array)
+
+    def add(self, name, trajectory, speed, points):
+        """
+        Adds an entity, same arguments as Entity
+        :return: view of the new entity
+        """
+        if self._count == len(self.ticks):
+            self._allocate(self._count * 2)
+        image = texture_atlas.get(name)
+        # the rect rounds the start just like the rect of an Entity
+        rect = image.get_rect()
+        rect.x, rect.y = map(float, trajectory.at(0))
+        index = self._count
+        self.positions[index] = self.previous_positions[index] = rect.topleft
+        self.sizes[index] = rect.size
+        self.ticks[index] = 0
+        self.speeds[index] = speed
+        self.points[index] = points
+        self.delete[index] = False
+        self.free2catch[index] = False
+        self.start_x[index], self.end_x[index], self.vertex[index], self.highest_point[index], self.a[index], \
+            self.durations[index] = trajectory
+        self.names.append(name)
+        self.images.append(image)
+        self._count += 1
+        return EntityView(self, index)
+
+    def add_random(self):
+        return self.add(*get_random_entity_values())
+
+    def compact(self):
+        """
+        Removes every entity marked for deletion, the remaining ones keep their order
+        """
+        keep = ~self.delete[:self._count]
+        if keep.all():
+            return
+        kept = np.flatnonzero(keep)
+        for name in self._columns:
+            array = getattr(self, name)
+            array[:len(kept)] = array[kept]
+        self.names = [self.names[index] for index in kept]
+        self.images = [self.images[index] for index in kept]
+        self._count = len(kept)
+
+    def catchable(self):
+        """
+        :return: indices of the entities flying down
+        """
+        return np.flatnonzero(self.free2catch[:self._count])
+
+    def boxes(self, indices=None):
+        """
+        :param indices: only these entities, default all
+        :return: (n, 4) array of x, y, width, height like Collision.boxes_of, without indices a view of the store
+        """
+        if indices is None:
+            indices = slice(0, self._count)
+        return self._boxes[indices]
+
+    def update(self):
+        """
+        Same as Entity.update for every entity at once:
+        the next point of the path or delete if the path is over
+        """
+        count = self._count
+        self.previous_positions[:count] = self.positions[:count]
+        ticks = self.ticks[:count]
+        ticks += 1
+        ended = ticks >= self.durations[:count]
+        self.delete[:count] |= ended
+        # mostly no path ends in this step, a slice is a view instead of a copy of each array
+        moving = np.flatnonzero(~ended) if ended.any() else slice(0, count)
+        previous_y = self.previous_positions[moving, 1]
+        x_values, y_values = evaluate_trajectories(self.start_x[moving], self.end_x[moving], self.vertex[moving],
+                                                   self.highest_point[moving], self.a[moving], self.durations[moving],
+                                                   ticks[moving])
+        # assigning floats to the int positions truncates them, just like assigning them to a rect
+        self.positions[moving, 0] = x_values
+        self.positions[moving, 1] = y_values
+        # now the entity reached its highest y value and can be catched
+        self.free2catch[moving] |= previous_y < self.positions[moving, 1]
+
+    def draw(self, screen, alpha=1., return_rects=False):
+        """
+        :param alpha: how far the frame is between the previous and the current step, 0 to 1
+        :param return_rects: also return the area of each entity, for dirty rects
+        :return: list of the drawn areas if return_rects is set
+        """
+        positions = self.positions[:self._count]
+        if alpha < 1:
+            previous = self.previous_positions[:self._count]
+            positions = np.rint(previous + (positions - previous) * alpha).astype(np.int64)
+        return screen.blits(list(zip(self.images, positions.tolist())), doreturn=return_rects)
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if not -self._count <= index < self._count:
+            raise IndexError(f"entity {index} out of {self._count}")
+        return EntityView(self, index % self._count)
+
+    def __iter__(self):
+        return (EntityView(self, index) for index in range(self._count))
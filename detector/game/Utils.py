@@ -1,5 +1,7 @@
+from collections import OrderedDict
 from enum import Enum
 import random
+from typing import NamedTuple
 import numpy as np
 import pygame
 from numpy.core.records import ndarray
@@ -18,7 +20,46 @@ class ScreenBorderType(Enum):
     ANY = 4
 
 
-def calculate_random_parabola(speed: int):
+def evaluate_trajectories(start_x, end_x, vertex, highest_point, a, duration, ticks):
+    """
+    Closed form of the parabolic way, works for one entity or for arrays of entities at once.
+    The x values step evenly from start_x to end_x in duration points, just like np.linspace,
+    so the values are the same as the ones of the precomputed arrays.
+    :param ticks: tick of each entity, from 0 to duration - 1
+    :return: x and y values at the ticks
+    """
+    step = (end_x - start_x) / (duration - 1)
+    x_values = np.where(ticks == duration - 1, end_x, ticks * step + start_x)
+    y_values = a * (x_values - vertex) ** 2 + highest_point
+    return x_values, y_values
+
+
+class Trajectory(NamedTuple):
+    """
+    Parameters of a parabolic way, the points are evaluated from the tick when they are needed
+    """
+    start_x: float
+    end_x: float
+    vertex: float
+    highest_point: float
+    a: float
+    duration: int
+
+    def at(self, tick):
+        """
+        :param tick: a tick or an array of ticks
+        :return: x and y value at the tick
+        """
+        return evaluate_trajectories(*self, tick)
+
+    def points(self):
+        """
+        :return: all x values and all y values of the way
+        """
+        return self.at(np.arange(self.duration))
+
+
+def calculate_random_parabola(speed: int) -> Trajectory:
     """
     Calculates a random parabolic path of an entity.
 
@@ -28,8 +69,11 @@ def calculate_random_parabola(speed: int):
     # Random int between a min width and max width
     # Screen start -> |Min width, .............., max width| <- Screen start
     # Changes could be done in Config.py
-    x_pos = random.randint(Config.SCREEN_MIN_WIDTH_FRUIT, Config.SCREEN_WIDTH - Config.SCREEN_MIN_WIDTH_FRUIT)
     middle_of_x = Config.SCREEN_WIDTH // 2
+    x_pos = middle_of_x
+    # a start in the middle would be a path without width, draw again
+    while x_pos == middle_of_x:
+        x_pos = random.randint(Config.SCREEN_MIN_WIDTH_FRUIT, Config.SCREEN_WIDTH - Config.SCREEN_MIN_WIDTH_FRUIT)
     # Random int of how high a entity can fly
     highest_point = random.randint(Config.SCREEN_MIN_HEIGHT_FRUIT, Config.SCREEN_MAX_HEIGHT_FRUIT)
     # High Point or... vertex
@@ -38,22 +82,16 @@ def calculate_random_parabola(speed: int):
     # Calculate the coefficient "a" to ensure the parabola inverts and opens downward
     a = (Config.SCREEN_HEIGHT - highest_point) / ((vertex - middle_of_x) ** 2)
 
-    # create with numpy the x values of the parabola
     # speed * points on path
     # the lower speed * points_on_path -> faster fruit
     points_on_path = 40
-    if x_pos > middle_of_x:
-        x_values = np.linspace(middle_of_x, x_pos, speed * points_on_path)
-    else:
-        x_values = np.linspace(x_pos, middle_of_x, speed * points_on_path)
+    # the way always runs from left to right, between the middle and x_pos
+    start_x, end_x = min(middle_of_x, x_pos), max(middle_of_x, x_pos)
 
-    if random.randint(0, 1) == 0:
-        x_values.sort(-1)
+    # was a sort of the already ascending x values, still drawn so the same seed gives the same ways
+    random.randint(0, 1)
 
-    # calculate all matching y values to x
-    y_values = a * (x_values - vertex) ** 2 + highest_point
-
-    return x_values, y_values
+    return Trajectory(float(start_x), float(end_x), vertex, float(highest_point), a, speed * points_on_path)
 
 
 # DEPRECATED
@@ -73,10 +111,53 @@ def calculate_angle(pos_x: tuple):
     return beta
 
 
+class TextRenderer:
+    def __init__(self, max_cached_surfaces=None):
+        """
+        Renders text for the HUD.
+        Fonts are kept by (family, size), so SysFont only searches and loads a font once.
+        Rendered surfaces are kept in a LRU cache by (text, color, family, size),
+        an unchanged score or fps value is only blitted again and not rendered.
+        :param max_cached_surfaces: size of the LRU cache, default Config.TEXT_CACHE_SIZE
+        """
+        self.max_cached_surfaces = max_cached_surfaces if max_cached_surfaces is not None else Config.TEXT_CACHE_SIZE
+        self._fonts = {}
+        self._surfaces = OrderedDict()
+
+    def get_font(self, family: str, size: int) -> pygame.font.Font:
+        font = self._fonts.get((family, size))
+        if font is None:
+            font = pygame.font.SysFont(family, size)
+            self._fonts[(family, size)] = font
+        return font
+
+    def render(self, text: str, color: tuple, family: str = None, size: int = None) -> pygame.Surface:
+        """
+        :return: the rendered text, shared with the cache and must not be drawn on
+        """
+        family = family if family is not None else Config.FONT_FAMILY
+        size = size if size is not None else Config.FONT_SIZE
+        key = (text, tuple(color), family, size)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            # mark as recently used
+            self._surfaces.move_to_end(key)
+            return surface
+        surface = self.get_font(family, size).render(text, True, color)
+        self._surfaces[key] = surface
+        if len(self._surfaces) > self.max_cached_surfaces:
+            # drop the least recently used one
+            self._surfaces.popitem(last=False)
+        return surface
+
+
+# Shared renderer of the HUD
+text_renderer = TextRenderer()
+
+
 def draw_text_on_screen(screen, text: str, pos: tuple, color: tuple):
     """
     Simple convinience function to draw a text with its attributes
+    :return: the area drawn to
     """
-    font = pygame.font.SysFont(Config.FONT_FAMILY, Config.FONT_SIZE)
-    text = font.render(text, True, color)
-    screen.blit(text, pos)
+    return screen.blit(text_renderer.render(text, color), pos)